@@ -0,0 +1,55 @@
+"""
+Measures the time taken to import the netx package in fresh interpreters.
+
+Usage: python benchmarks/import_time.py [-n RUNS]
+"""
+
+from __future__ import print_function
+
+import argparse
+import subprocess
+import sys
+
+STATEMENTS = [
+    'import netx',
+    'from netx.constants import SEARCH_TYPE_KEYWORDS',
+    'from netx.exceptions import ResponseError',
+    'from netx import NetX',
+    'from netx import NetX; NetX({}).transport',
+]
+
+TIMER = """
+import sys, time
+start = time.time()
+%s
+elapsed = time.time() - start
+print('%%f %%d' %% (elapsed * 1000, 'requests' in sys.modules))
+"""
+
+
+def measure(statement, runs):
+    """
+    Returns the best import time in ms of `statement` over `runs` fresh
+    interpreters, and whether it imported `requests`.
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER % statement])
+        elapsed, imported = output.split()
+        timings.append(float(elapsed))
+    return min(timings), imported == b'1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    args = parser.parse_args()
+    for statement in STATEMENTS:
+        elapsed, imported = measure(statement, args.runs)
+        print('%8.2fms  %-9s  %s' % (
+            elapsed, 'requests' if imported else '', statement))
+
+
+if __name__ == '__main__':
+    main()
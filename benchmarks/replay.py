@@ -0,0 +1,241 @@
+"""
+Drives workloads replayed from an archive recorded with
+`netx.replay.RecordingTransport` through the NetX client, at N times
+concurrency and optionally profiled, and reports their throughput.
+
+Workloads:
+  rpc         every recorded JSON-RPC call, through `NetX._json_post`
+  asset_info  every recorded getAssetBean call, through `get_asset_info`
+  search      every recorded keyword search, paginated with `pages`
+  files       every recorded file download, through `NetX._get`
+
+Usage: python benchmarks/replay.py ARCHIVE [-w WORKLOAD ...]
+           [-c CONCURRENCY] [-s SPEED] [-p {cprofile,pyinstrument}]
+           [-o OUTPUT]
+"""
+
+from __future__ import print_function
+
+import argparse
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.insert(
+    0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402,F401 (imported here to not time its import)
+from netx import NetX  # noqa: E402
+from netx.constants import (  # noqa: E402
+    SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_THESAURUS)
+from netx.replay import ReplayTransport  # noqa: E402
+
+DATA_TYPE = 'x7/json/'
+
+
+class Unlimited(object):
+    """
+    Rate limiter which does not limit the replayed requests.
+    """
+    def wait(self):
+        pass
+
+
+def client(transport, url, **settings):
+    """
+    Returns a client sending requests with `transport`, without rate limit or
+    coalescing, logged in with the redacted session key.
+    """
+    api = NetX(dict({
+        'URL': url,
+        'TRANSPORT': transport,
+        'RATE_LIMITER': Unlimited(),
+        'COALESCE_REQUESTS': False,
+    }, **settings))
+    api._session_key = 'REDACTED'
+    api._user = {'userId': 0}
+    return api
+
+
+def rpc_workload(api, entries):
+    for entry in entries:
+        rpc = entry.get('rpc')
+        if rpc and rpc['method'] != 'authenticate':
+            context = {'method': rpc['method'], 'params': rpc['params']}
+            yield functools.partial(api._json_post, context)
+
+
+def asset_info_workload(api, entries):
+    for entry in entries:
+        rpc = entry.get('rpc')
+        if rpc and rpc['method'] == 'getAssetBean':
+            yield functools.partial(api.get_asset_info, rpc['params'][0])
+
+
+def search_workload(api, entries):
+    clients = {}  # By page size, which is part of the recorded requests
+    for entry in entries:
+        rpc = entry.get('rpc')
+        if not rpc or rpc['method'] != 'searchAssetBeanObjects':
+            continue
+        params = rpc['params']
+        types, values_1, start_index, assets_per_page = (
+            params[3], params[6], params[-2], params[-1])
+        if (types == [SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_THESAURUS] and
+                start_index == 1):
+            if assets_per_page not in clients:
+                clients[assets_per_page] = client(
+                    api.transport, api.root_url,
+                    ASSETS_PER_PAGE=assets_per_page)
+            yield functools.partial(
+                lambda api, keyword: list(api.pages(api.search, keyword)),
+                clients[assets_per_page], values_1[0])
+
+
+def files_workload(api, entries):
+    for entry in entries:
+        if entry['method'] == 'GET':
+            yield functools.partial(api._get, entry['url'], entry['params'])
+
+
+WORKLOADS = OrderedDict([
+    ('rpc', rpc_workload),
+    ('asset_info', asset_info_workload),
+    ('search', search_workload),
+    ('files', files_workload),
+])
+
+
+def root_url(entries):
+    """
+    Returns the root URL of the recorded NetX server.
+    """
+    for entry in entries:
+        if entry['method'] == 'POST' and entry['url'].endswith(DATA_TYPE):
+            return entry['url'][:-len(DATA_TYPE)].rstrip('/')
+    return 'http://replay'
+
+
+def run(calls, concurrency, profiler=None):
+    """
+    Runs all `calls` in each of `concurrency` threads. Returns the elapsed
+    seconds, the latencies of the calls, the number of errors and the
+    profilers of the threads.
+    """
+    latencies = []
+    errors = [0]
+    profilers = []
+    lock = threading.Lock()
+
+    def worker(index):
+        profile = None
+        if profiler == 'cprofile':
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        elif profiler == 'pyinstrument' and index == 0:
+            from pyinstrument import Profiler
+            profile = Profiler()
+            profile.start()
+        for call in calls:
+            start = time.time()
+            try:
+                call()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.time() - start)
+        if profile is not None:
+            if profiler == 'cprofile':
+                profile.disable()
+            else:
+                profile.stop()
+            with lock:
+                profilers.append(profile)
+
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start, sorted(latencies), errors[0], profilers
+
+
+def write_profile(name, profiler, profilers, output):
+    """
+    Writes the profile of a workload into the output directory. cProfile
+    profiles of all threads are merged, pyinstrument profiles the first
+    thread only.
+    """
+    if not profilers:
+        return
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    path = os.path.join(output, name)
+    if profiler == 'cprofile':
+        import pstats
+        with open(path + '.txt', 'w') as f:
+            stats = pstats.Stats(*profilers, stream=f)
+            stats.dump_stats(path + '.prof')
+            stats.sort_stats('cumulative').print_stats(30)
+        print('  profile: %s.prof, %s.txt' % (path, path))
+    else:
+        with open(path + '.html', 'w') as f:
+            f.write(profilers[0].output_html())
+        print('  profile: %s.html' % path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay recorded NetX traffic through the client.')
+    parser.add_argument('archive', help='Archive recorded with '
+                        'netx.replay.RecordingTransport.')
+    parser.add_argument(
+        '-w', '--workload', action='append', choices=list(WORKLOADS),
+        help='Workload to run, may be repeated (default: all).')
+    parser.add_argument(
+        '-c', '--concurrency', type=int, default=1,
+        help='Number of threads running each workload (default: 1).')
+    parser.add_argument(
+        '-s', '--speed', type=float, default=0,
+        help='Replay recorded latencies divided by SPEED, e.g. 1 for '
+        'original latencies or 10 for 10x faster (default: 0, no delay).')
+    parser.add_argument(
+        '-p', '--profile', choices=['cprofile', 'pyinstrument'],
+        help='Profile each workload.')
+    parser.add_argument(
+        '-o', '--output', default='replay-profiles',
+        help='Directory for profiles (default: replay-profiles).')
+    args = parser.parse_args()
+
+    transport = ReplayTransport(args.archive, speed=args.speed or None)
+    print('%-12s %7s %6s %8s %9s %8s %8s' % (
+        'workload', 'calls', 'errors', 'seconds', 'calls/s', 'p50 ms',
+        'p95 ms'))
+    for name in args.workload or list(WORKLOADS):
+        api = client(transport, root_url(transport.entries))
+        calls = list(WORKLOADS[name](api, transport.entries))
+        if not calls:
+            print('%-12s no recorded calls' % name)
+            continue
+        elapsed, latencies, errors, profilers = run(
+            calls, args.concurrency, args.profile)
+        count = len(latencies) + errors
+        print('%-12s %7d %6d %8.2f %9.1f %8.2f %8.2f' % (
+            name, count, errors, elapsed, count / max(elapsed, 1e-9),
+            latencies[len(latencies) // 2] * 1000 if latencies else 0,
+            latencies[int(0.95 * (len(latencies) - 1))] * 1000
+            if latencies else 0))
+        write_profile(name, args.profile, profilers, args.output)
+
+
+if __name__ == '__main__':
+    main()
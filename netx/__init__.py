@@ -1,3 +1,20 @@
 __version__ = '0.1'
 
-from netx import SettingsError, ResponseError, NetX
+import sys
+
+from .exceptions import SettingsError, ResponseError
+
+if sys.version_info < (3, 7):
+    from .netx import NetX
+else:
+    def __getattr__(name):
+        """
+        Imports `NetX` on first use, so that importing the package, its
+        constants or its exceptions stays cheap.
+        """
+        if name == 'NetX':
+            from .netx import NetX
+            globals()['NetX'] = NetX
+            return NetX
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name))
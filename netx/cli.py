@@ -0,0 +1,346 @@
+"""
+Command line interface to export or mirror NetX categories and carts to disk.
+
+Usage examples:
+
+    python -m netx -s http://example.com -u USERNAME -p PASSWORD \\
+        export --category 'Artworks/Artists M-Q' --output ./export
+    python -m netx mirror --category Artworks --renditions original \\
+        --output ./mirror
+
+Metadata for each asset is written to `metadata.jsonl` in the output
+directory and renditions are downloaded by a pool of worker processes, which
+also hash the downloaded files. Completed downloads are recorded in
+`checkpoint.jsonl` so that an interrupted run resumes where it stopped.
+"""
+
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import sys
+import time
+
+from .netx import NetX
+from .ratelimit import SharedRateLimiter
+
+METADATA_FILENAME = 'metadata.jsonl'
+CHECKPOINT_FILENAME = 'checkpoint.jsonl'
+
+_worker_api = None  # NetX instance of a worker process
+
+
+def _read_jsonl(path):
+    """
+    Yields the records in a JSON Lines file, ignoring a partially written
+    last line.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                pass
+
+
+def _open_jsonl(path):
+    """
+    Opens a JSON Lines file for appending, terminating a partially written
+    last line first.
+    """
+    f = open(path, 'a+')
+    f.seek(0, os.SEEK_END)
+    if f.tell():
+        f.seek(f.tell() - 1)
+        if f.read(1) != '\n':
+            f.write('\n')
+    return f
+
+
+def _write_jsonl(f, record):
+    f.write(json.dumps(record, sort_keys=True) + '\n')
+    f.flush()
+
+
+def _init_worker(settings, session_key, user):
+    """
+    Creates the NetX instance of a worker process, reusing the session of the
+    parent process.
+    """
+    global _worker_api
+    _worker_api = NetX(settings)
+    _worker_api._session_key = session_key
+    _worker_api._user = user
+
+
+def _download(task):
+    """
+    Downloads a rendition of an asset to `task['path']` (without extension)
+    in a worker process, writing and hashing it chunk by chunk. Returns the
+    task with the path, size and SHA-256 of the downloaded file, or the
+    error.
+    """
+    result = dict(task)
+    try:
+        headers, chunks = _worker_api.file_chunks(
+            task['asset_id'], data=task['rendition'])
+        content_type = headers.get('content-type', '').split(';')[0]
+        path = task['path'] + (mimetypes.guess_extension(content_type) or '')
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:  # Created by another worker
+                pass
+        size = 0
+        sha256 = hashlib.sha256()
+        with open(path + '.part', 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+                sha256.update(chunk)
+        os.rename(path + '.part', path)
+    except Exception as err:
+        result['error'] = '%s' % err
+        return result
+    result.update(
+        path=path,
+        size=size,
+        sha256=sha256.hexdigest(),
+    )
+    return result
+
+
+def resolve_category_path(api, path):
+    """
+    Returns the category path, as accepted by `NetX.category_assets`, for a
+    '/' separated path of category names, e.g. 'Artworks/Artists M-Q'.
+    """
+    category_path = [{'id': 1, 'name': ''}]  # Root category
+    for name in [name for name in path.split('/') if name]:
+        categories = api.categories(category_path[-1]['id'])
+        matches = [c for c in categories if c['name'] == name]
+        if not matches:
+            raise ValueError('Category %r not found in %r.' % (
+                name, '/'.join(c['name'] for c in category_path[1:])))
+        category_path.append(matches[0])
+    return category_path
+
+
+def walk_category(api, category_path, recursive=False):
+    """
+    Yields `(category_path, asset)` for each asset in the category and, if
+    `recursive`, its sub categories.
+    """
+    for page in api.pages(api.category_assets, category_path):
+        for asset in page:
+            yield category_path, asset
+    if recursive:
+        for category in api.categories(category_path[-1]['id']):
+            for item in walk_category(api, category_path + [category], True):
+                yield item
+
+
+def walk_cart(api, cart_id):
+    """
+    Yields `(None, asset)` for each asset in the cart.
+    """
+    for page in api.pages(api.cart_assets, cart_id):
+        for asset in page:
+            yield None, asset
+
+
+class Exporter(object):
+    """
+    Writes metadata and downloads renditions of the walked assets into the
+    output directory, resuming from the checkpoint of a previous run.
+    """
+    def __init__(self, api, settings, output, renditions, processes=4,
+                 mirror=False):
+        self.api = api
+        self.settings = settings
+        self.output = output
+        self.renditions = renditions
+        self.processes = processes
+        self.mirror = mirror
+        self.stats = dict.fromkeys([
+            'assets', 'downloaded', 'skipped', 'failed', 'bytes'], 0)
+
+    def _tasks(self, items, metadata, done):
+        """
+        Writes metadata for each walked asset not already written, and yields
+        the download tasks not already completed.
+        """
+        written = set(record['assetId'] for record in _read_jsonl(
+            os.path.join(self.output, METADATA_FILENAME)))
+        for category_path, asset in items:
+            self.stats['assets'] += 1
+            asset_id = asset['assetId']
+            directory = 'files'
+            if self.mirror and category_path:
+                names = [c['name'].replace(os.sep, '_')
+                         for c in category_path[1:]]
+                directory = os.path.join('.', *names)
+            if asset_id not in written:
+                record = dict(asset)
+                if category_path is not None:
+                    record['categoryPath'] = '/'.join(
+                        c['name'] for c in category_path[1:])
+                _write_jsonl(metadata, record)
+                written.add(asset_id)
+            for rendition in self.renditions:
+                if (asset_id, rendition) in done:
+                    self.stats['skipped'] += 1
+                    continue
+                yield {
+                    'asset_id': asset_id,
+                    'rendition': rendition,
+                    'path': os.path.join(
+                        self.output, directory,
+                        '%s_%s' % (asset_id, rendition)),
+                }
+
+    def run(self, items):
+        """
+        Exports the `(category_path, asset)` pairs yielded by `items`.
+        Returns the stats of the run.
+        """
+        if not os.path.isdir(self.output):
+            os.makedirs(self.output)
+        checkpoint_path = os.path.join(self.output, CHECKPOINT_FILENAME)
+        done = set(
+            (record['asset_id'], record['rendition'])
+            for record in _read_jsonl(checkpoint_path)
+            if 'error' not in record)
+
+        start = time.time()
+        pool = multiprocessing.Pool(
+            self.processes, _init_worker, (
+                self.settings, self.api.session_key, self.api.user))
+        metadata = _open_jsonl(os.path.join(self.output, METADATA_FILENAME))
+        checkpoint = _open_jsonl(checkpoint_path)
+        try:
+            tasks = self._tasks(items, metadata, done)
+            for result in pool.imap_unordered(_download, tasks):
+                _write_jsonl(checkpoint, result)
+                if 'error' in result:
+                    self.stats['failed'] += 1
+                    print('failed %(asset_id)s %(rendition)s: %(error)s'
+                          % result, file=sys.stderr)
+                else:
+                    self.stats['downloaded'] += 1
+                    self.stats['bytes'] += result['size']
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            metadata.close()
+            checkpoint.close()
+        self.stats['seconds'] = time.time() - start
+        return self.stats
+
+
+def report(stats, file=sys.stdout):
+    """
+    Prints the throughput of an export.
+    """
+    seconds = max(stats['seconds'], 0.001)
+    print(
+        'assets: %(assets)d, downloaded: %(downloaded)d, '
+        'skipped: %(skipped)d, failed: %(failed)d' % stats, file=file)
+    print(
+        '%.1fMB in %.1fs: %.2fMB/s, %.2f files/s, %.2f assets/s' % (
+            stats['bytes'] / 1024.0 / 1024, seconds,
+            stats['bytes'] / 1024.0 / 1024 / seconds,
+            stats['downloaded'] / seconds,
+            stats['assets'] / seconds,
+        ), file=file)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m netx',
+        description='Export or mirror NetX categories and carts to disk.')
+    parser.add_argument(
+        '-s', '--url', default=os.environ.get('NETX_URL'),
+        help='NetX server URL (default: $NETX_URL).')
+    parser.add_argument(
+        '-u', '--username', default=os.environ.get('NETX_USERNAME'),
+        help='NetX username (default: $NETX_USERNAME).')
+    parser.add_argument(
+        '-p', '--password', default=os.environ.get('NETX_PASSWORD'),
+        help='NetX password (default: $NETX_PASSWORD).')
+    parser.add_argument(
+        '-r', '--requests-per-second', type=float, default=5,
+        help='Requests per second across all processes (default: 5).')
+    parser.add_argument(
+        '-a', '--assets-per-page', type=int, default=100,
+        help='Assets per page when listing assets (default: 100).')
+    parser.add_argument(
+        '-j', '--processes', type=int, default=4,
+        help='Number of download processes (default: 4).')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    export = subparsers.add_parser(
+        'export', help='Export the assets in a category or cart.')
+    source = export.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '--category', help="Category path, e.g. 'Artworks/Artists M-Q'.")
+    source.add_argument('--cart', type=int, help='Cart ID.')
+
+    mirror = subparsers.add_parser(
+        'mirror', help='Mirror a category and its sub categories, keeping '
+        'the category structure.')
+    mirror.add_argument(
+        '--category', required=True,
+        help="Category path, e.g. 'Artworks'.")
+
+    for subparser in (export, mirror):
+        subparser.add_argument(
+            '-o', '--output', required=True, help='Output directory.')
+        subparser.add_argument(
+            '--renditions', default='zoom',
+            help='Comma separated renditions to download: original, thumb, '
+            'preview and/or zoom. Empty for metadata only (default: zoom).')
+    return parser
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if not (args.url and args.username and args.password):
+        parser.error('URL, username and password are required.')
+
+    settings = {
+        'URL': args.url.rstrip('/'),
+        'USERNAME': args.username,
+        'PASSWORD': args.password,
+        'ASSETS_PER_PAGE': args.assets_per_page,
+        'RATE_LIMITER': SharedRateLimiter(args.requests_per_second),
+    }
+    api = NetX(settings)
+    if args.category is not None:
+        try:
+            category_path = resolve_category_path(api, args.category)
+        except ValueError as err:
+            parser.error('%s' % err)
+        items = walk_category(
+            api, category_path, recursive=args.command == 'mirror')
+    else:
+        items = walk_cart(api, args.cart)
+
+    exporter = Exporter(
+        api, settings, args.output,
+        renditions=[r for r in args.renditions.split(',') if r],
+        processes=args.processes,
+        mirror=args.command == 'mirror')
+    report(exporter.run(items))
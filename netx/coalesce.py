@@ -0,0 +1,116 @@
+"""
+Request coalescing (single-flight) for identical concurrent calls.
+
+While a call for a key is in flight, identical calls for the same key wait
+for it and share its result instead of making their own request.
+"""
+
+import copy
+import threading
+
+
+class _Call(object):
+    """
+    A call in flight and the callers waiting for it.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces identical concurrent calls made from different threads.
+    `coalesced` counts the calls that shared the result of another call.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Calls `fn(*args, **kwargs)` unless a call for `key` is already in
+        flight, in which case waits for that call and returns a copy of its
+        result, or raises its exception.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = _Call()
+                waiter = False
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                waiter = True
+        if waiter:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            # Waiters copy an unmodified result as the caller is free to
+            # modify the one returned to it.
+            if call.error is None and call.waiters:
+                call.result = copy.deepcopy(result)
+            call.event.set()
+        return result
+
+
+class AsyncSingleFlight(object):
+    """
+    Coalesces identical concurrent calls made from coroutines running in the
+    same asyncio event loop. `coalesced` counts the calls that shared the
+    result of another call.
+    """
+    def __init__(self):
+        self.futures = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns a future for the result of `fn(*args, **kwargs)`, sharing the
+        call already in flight for `key` if there is one. `fn` may be a
+        coroutine function, or a blocking callable which is run in the
+        default executor of the event loop.
+        """
+        import asyncio
+        loop = asyncio.get_event_loop()
+        shared = self.futures.get(key)
+        if shared is not None:
+            self.coalesced += 1
+        else:
+            if asyncio.iscoroutinefunction(fn):
+                shared = asyncio.ensure_future(fn(*args, **kwargs))
+            else:
+                shared = loop.run_in_executor(
+                    None, lambda: fn(*args, **kwargs))
+            self.futures[key] = shared
+            shared.add_done_callback(lambda _: self.futures.pop(key, None))
+
+        # Each caller gets its own future holding its own copy of the result,
+        # so cancelling one caller does not cancel the shared call.
+        future = loop.create_future()
+
+        def resolve(shared):
+            if future.cancelled():
+                return
+            if shared.cancelled():
+                future.cancel()
+            elif shared.exception() is not None:
+                future.set_exception(shared.exception())
+            else:
+                future.set_result(copy.deepcopy(shared.result()))
+        shared.add_done_callback(resolve)
+        return future
@@ -0,0 +1,85 @@
+"""
+Constants for NetX settings and the JSON-RPC X7 API. Importing this module
+does not import the HTTP stack.
+"""
+
+DEFAULT_ASSETS_PER_PAGE = 10
+DEFAULT_TIMEOUT = 60  # Requests timeout in seconds
+DEFAULT_CHUNK_SIZE = 64 * 1024  # Bytes read at a time from streamed files
+DEFAULT_REQUESTS_PER_SECOND = 1
+DEFAULT_MIN_REQUESTS_PER_SECOND = 0.2  # Floor and ceiling for ADAPTIVE_RATE
+DEFAULT_MAX_REQUESTS_PER_SECOND = 20
+DEFAULT_REPURPOSE_CHUNK_SIZE = 100  # Assets per batch repurpose job
+DEFAULT_REPURPOSE_TIMEOUT = 600  # Seconds to wait for a repurpose job
+DEFAULT_HEDGE_PERCENTILE = 95  # Latency percentile to hedge requests after
+DEFAULT_HEDGE_BUDGET = 0.05  # Fraction of requests which may be hedged
+
+#
+# Constants for JSON-RPC X7 API
+#
+
+# Sort order
+SORT_ORDER_ASCENDING = 0
+SORT_ORDER_DESCENDING = 1
+
+# Search types
+SEARCH_TYPE_KEYWORDS = 1
+SEARCH_TYPE_CONTENTS = 2
+SEARCH_TYPE_METADATA = 3
+SEARCH_TYPE_DATE = 4
+SEARCH_TYPE_CATEGORY = 5
+SEARCH_TYPE_FILE_FORMAT = 6
+SEARCH_TYPE_FILE_SIZE = 7
+SEARCH_TYPE_RAW = 8
+SEARCH_TYPE_CUSTOM = 9
+SEARCH_TYPE_CART = 10
+SEARCH_TYPE_RELATED_ASSETS = 11
+SEARCH_TYPE_LAST_SEARCH = 12
+SEARCH_TYPE_CHECKOUT = 13
+SEARCH_TYPE_THESAURUS = 14
+SEARCH_TYPE_BRANCH_CHILDREN = 15
+SEARCH_TYPE_REVIEWS = 16
+SEARCH_TYPE_EXPIRE = 17
+SEARCH_TYPE_METADATA_HISTORY = 18
+SEARCH_TYPE_RATING = 19
+SEARCH_TYPE_LOCATION = 20
+SEARCH_TYPE_PROOF = 21
+SEARCH_TYPE_FILE_ASPECT = 22
+
+# Keyword/contents/metadata sub-types
+QUERY_TYPE_AND = 0
+QUERY_TYPE_EXACT = 1
+QUERY_TYPE_OR = 2
+QUERY_TYPE_NOT = 3
+QUERY_TYPE_AND_FRAG = 4
+QUERY_TYPE_OR_FRAG = 5
+QUERY_TYPE_RANGE = 6
+QUERY_TYPE_PHRASE = 7
+QUERY_TYPE_RAW = 8
+QUERY_TYPE_EMPTY = 9
+
+# Category sub-types 1
+CATEGORY_TYPE_ONLY_RECURSIVE = 0
+CATEGORY_TYPE_EXCLUDE_RECURSIVE = 1
+CATEGORY_TYPE_ONLY = 2
+CATEGORY_TYPE_EXCLUDE = 3
+CATEGORY_TYPE_RECURSIVE = 4
+
+# Notify types
+NOTIFY_TYPE_NONE = 0
+NOTIFY_TYPE_WEEKLY = 1
+NOTIFY_TYPE_DAILY = 2
+NOTIFY_TYPE_IMMEDIATELY = 3
+
+# JSON-RPC methods which do not change anything on the origin server, so
+# identical concurrent calls can share one request.
+IDEMPOTENT_METHODS = frozenset([
+    'getAllPresetProcesses',
+    'getAssetBean',
+    'getAssetObjects',
+    'getCategories',
+    'getPresetProcessData',
+    'getSelf',
+    'getUserCarts',
+    'searchAssetBeanObjects',
+])
@@ -0,0 +1,18 @@
+"""
+Exceptions raised by the NetX client. Importing this module does not import
+the HTTP stack.
+"""
+
+
+class SettingsError(Exception):
+    """
+    Exception used when backend settings are not configured.
+    """
+    pass
+
+
+class ResponseError(Exception):
+    """
+    Exception used when we receive unexpected response from origin server.
+    """
+    pass
@@ -0,0 +1,122 @@
+"""
+Latency-hedged requests, to cut the tail latency of idempotent requests.
+
+If a request has not completed after a delay of a high percentile of recent
+latencies of requests of its kind, a duplicate request is sent and whichever
+completes first wins. Hedges are limited to a fraction of all requests, so a
+slow origin server does not get twice the load.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _close(future):
+    """
+    Closes the response of a request which lost the race.
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class Hedger(object):
+    """
+    Sends a duplicate of a request which is slower than the `percentile`
+    latency of the last `window` requests of the same kind, e.g. calls of one
+    JSON-RPC method or files of one rendition, at most one per request and at
+    most for `budget` (a fraction) of all requests. No request is hedged
+    until `min_samples` latencies of its kind have been recorded. Safe to
+    share between threads.
+    """
+    def __init__(self, percentile=95, budget=0.05, min_delay=0.01,
+                 window=100, min_samples=20, max_workers=16):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latencies = defaultdict(lambda: deque(maxlen=window))  # By kind
+        self.tokens = 0.0  # Hedges which may be sent now
+        self.hedged = 0  # Number of hedges sent
+        self.hedge_wins = 0  # Number of hedges which completed first
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def delay(self, kind=None):
+        """
+        Returns the delay in seconds after which to hedge a request of the
+        `kind`, or None if there are not enough latencies recorded yet.
+        """
+        with self.lock:
+            if len(self.latencies[kind]) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies[kind])
+        index = int(self.percentile / 100.0 * (len(latencies) - 1))
+        return max(latencies[index], self.min_delay)
+
+    def _timed(self, send, kind):
+        start = time.time()
+        response = send()
+        with self.lock:
+            self.latencies[kind].append(time.time() - start)
+        return response
+
+    def _take_token(self):
+        """
+        Takes a hedge token, if there is one, for a request which may be
+        hedged. Returns whether one was taken.
+        """
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def _return_token(self):
+        with self.lock:
+            self.tokens = min(self.tokens + 1, 1 + self.budget)
+
+    def call(self, send, send_hedge=None, kind=None):
+        """
+        Calls `send`, which sends a request of the `kind` and returns its
+        streamed response, and hedges it with a call to `send_hedge` (default
+        `send`) if it is slow. Returns the response which completes first, and
+        closes the other one.
+
+        Only a request which takes a hedge token is sent from the thread
+        pool, so that its caller can return as soon as either request
+        completes. The others are sent from the thread of the caller, so the
+        size of the pool does not limit concurrent requests.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens + self.budget, 1 + self.budget)
+        delay = self.delay(kind)
+        if delay is None or not self._take_token():
+            return self._timed(send, kind)
+
+        primary = self.executor.submit(self._timed, send, kind)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            self._return_token()
+            return primary.result()
+
+        LOGGER.info('hedging request after %.3fs', delay)
+        with self.lock:
+            self.hedged += 1
+        hedge = self.executor.submit(self._timed, send_hedge or send, kind)
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = done.pop() if len(done) == 1 else primary
+        loser = hedge if winner is primary else primary
+        if winner.exception() is not None:
+            # Fall back to the other request if the first one failed.
+            if loser.exception() is None:
+                winner, loser = loser, winner
+        loser.add_done_callback(_close)
+        if winner is hedge:
+            with self.lock:
+                self.hedge_wins += 1
+        return winner.result()
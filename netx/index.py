@@ -0,0 +1,434 @@
+"""
+Persistent local index of NetX assets, backed by sqlite.
+
+The index is populated from the asset beans returned by `search` and
+`category_assets` pages and from `get_asset_info` results. Searches are only
+answered offline within categories which `AssetIndex.sync` has fully indexed,
+or anywhere once the root category was synced recursively, as other results
+could be incomplete. Queries that the index cannot answer
+raise `IndexMiss` so the caller can fall back to the live API.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from .constants import (
+    CATEGORY_TYPE_EXCLUDE, CATEGORY_TYPE_EXCLUDE_RECURSIVE, CATEGORY_TYPE_ONLY,
+    CATEGORY_TYPE_ONLY_RECURSIVE, CATEGORY_TYPE_RECURSIVE,
+    DEFAULT_ASSETS_PER_PAGE, QUERY_TYPE_AND, QUERY_TYPE_AND_FRAG,
+    QUERY_TYPE_EXACT, QUERY_TYPE_OR, QUERY_TYPE_OR_FRAG, QUERY_TYPE_PHRASE,
+    SEARCH_TYPE_CATEGORY, SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_THESAURUS)
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS assets (
+        asset_id INTEGER PRIMARY KEY,
+        name TEXT,
+        modified INTEGER,
+        bean TEXT,
+        info TEXT,
+        synced INTEGER
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS assets_modified ON assets (modified)',
+    'CREATE INDEX IF NOT EXISTS assets_name ON assets (name)',
+    """
+    CREATE TABLE IF NOT EXISTS asset_categories (
+        category_path TEXT,
+        asset_id INTEGER,
+        PRIMARY KEY (category_path, asset_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS asset_categories_asset_id
+    ON asset_categories (asset_id)
+    """,
+    # Categories fully indexed by `sync`, with their sub categories if
+    # `recursive`
+    """
+    CREATE TABLE IF NOT EXISTS synced_categories (
+        category_path TEXT PRIMARY KEY,
+        recursive INTEGER,
+        synced INTEGER
+    )
+    """,
+]
+
+# Full text search over names and metadata. Falls back to a plain table
+# queried with LIKE when sqlite is built without FTS5.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS assets_text
+    USING fts5(name, metadata)
+"""
+PLAIN_TEXT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS assets_text (
+        rowid INTEGER PRIMARY KEY,
+        name TEXT,
+        metadata TEXT
+    )
+"""
+
+RECURSIVE_CATEGORY_TYPES = (
+    CATEGORY_TYPE_EXCLUDE_RECURSIVE,
+    CATEGORY_TYPE_ONLY_RECURSIVE,
+    CATEGORY_TYPE_RECURSIVE,
+)
+EXCLUDE_CATEGORY_TYPES = (
+    CATEGORY_TYPE_EXCLUDE,
+    CATEGORY_TYPE_EXCLUDE_RECURSIVE,
+)
+KEYWORD_SEARCH_TYPES = (SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_THESAURUS)
+KEYWORD_QUERY_TYPES = (
+    QUERY_TYPE_AND,
+    QUERY_TYPE_AND_FRAG,
+    QUERY_TYPE_EXACT,
+    QUERY_TYPE_OR,
+    QUERY_TYPE_OR_FRAG,
+    QUERY_TYPE_PHRASE,
+)
+
+
+class IndexMiss(Exception):
+    """
+    Exception used when the local index cannot answer a query.
+    """
+    pass
+
+
+def _attributes(asset):
+    """
+    Returns the metadata of an asset bean or asset info as a dict.
+    """
+    if 'attributes' in asset:
+        return asset['attributes']
+    return dict(zip(
+        asset.get('attributeNames') or [], asset.get('attributeValues') or []))
+
+
+def _modified(asset):
+    """
+    Returns the modification date of an asset, or its creation date when the
+    origin server did not send one.
+    """
+    return asset.get('moddate', asset.get('creationdate'))
+
+
+class AssetIndex(object):
+    """
+    Local sqlite index of assets with full text search over names and
+    metadata. Safe to share between threads.
+    """
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            try:
+                self.connection.execute(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.connection.execute(PLAIN_TEXT_SCHEMA)
+                self.fts = False
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def _upsert(self, asset_id, asset, bean=None, info=None):
+        """
+        Inserts or updates the row for `asset_id`, keeping whichever of
+        `bean` and `info` is not given. The asset info is dropped if the
+        asset was modified since it was recorded.
+        """
+        modified = _modified(asset)
+        attributes = _attributes(asset)
+        metadata = ' '.join(
+            '%s' % value for value in attributes.values() if value)
+        self.connection.execute(
+            """
+            INSERT OR IGNORE INTO assets (asset_id) VALUES (?)
+            """, (asset_id,))
+        self.connection.execute(
+            """
+            UPDATE assets SET
+                name = ?,
+                modified = ?,
+                bean = COALESCE(?, bean),
+                info = CASE
+                    WHEN ? IS NOT NULL THEN ?
+                    WHEN modified IS NOT ? THEN NULL
+                    ELSE info
+                END,
+                synced = ?
+            WHERE asset_id = ?
+            """, (
+                asset.get('name'),
+                modified,
+                bean and json.dumps(bean),
+                info and json.dumps(info),
+                info and json.dumps(info),
+                modified,
+                int(time.time() * 1000),
+                asset_id,
+            ))
+        self.connection.execute(
+            'DELETE FROM assets_text WHERE rowid = ?', (asset_id,))
+        self.connection.execute(
+            'INSERT INTO assets_text (rowid, name, metadata) VALUES (?, ?, ?)',
+            (asset_id, asset.get('name') or '', metadata))
+
+    def add_assets(self, assets, category_path=None):
+        """
+        Adds or updates asset beans, e.g. a page returned by `search` or
+        `category_assets`. `category_path` is the '/' separated path used in
+        category searches, e.g. 'Artworks/Artists M-Q'.
+        """
+        with self.lock, self.connection:
+            for asset in assets or []:
+                asset_id = asset['assetId']
+                self._upsert(asset_id, asset, bean=asset)
+                if category_path is not None:
+                    self.connection.execute(
+                        """
+                        INSERT OR IGNORE INTO asset_categories
+                            (category_path, asset_id)
+                        VALUES (?, ?)
+                        """, (category_path, asset_id))
+
+    def add_asset_info(self, info):
+        """
+        Adds or updates an asset info dict as returned by `get_asset_info`.
+        """
+        with self.lock, self.connection:
+            self._upsert(info['assetId'], info, info=info)
+
+    def remove_assets(self, asset_ids):
+        """
+        Removes the given assets from the index.
+        """
+        with self.lock, self.connection:
+            for asset_id in asset_ids:
+                for table, column in (
+                        ('assets', 'asset_id'),
+                        ('asset_categories', 'asset_id'),
+                        ('assets_text', 'rowid')):
+                    self.connection.execute(
+                        'DELETE FROM %s WHERE %s = ?' % (table, column),
+                        (asset_id,))
+
+    def get_asset_info(self, asset_id):
+        """
+        Returns the asset info last recorded by `add_asset_info`. Raises
+        `IndexMiss` if there is none.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT info FROM assets WHERE asset_id = ?',
+                (int(asset_id),)).fetchone()
+        if row is None or row[0] is None:
+            raise IndexMiss('asset %s is not indexed' % asset_id)
+        return json.loads(row[0])
+
+    def search(self, keyword, page_num=1, filters=None,
+               assets_per_page=DEFAULT_ASSETS_PER_PAGE):
+        """
+        Mirrors `NetX.search` against the index. Returns a page of asset beans
+        sorted by name in descending order. Raises `IndexMiss` if the filters
+        are not supported locally or if they are not limited to categories
+        fully indexed by `sync`. The default keyword filters are answered once
+        the root category was synced recursively.
+        """
+        if filters is None:  # Same default filters as `NetX.search`
+            filters = [
+                [SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_THESAURUS],
+                [QUERY_TYPE_AND_FRAG, QUERY_TYPE_OR],
+                [0, 0],
+                [keyword, keyword],
+                ['', ''],
+                ['', ''],
+            ]
+        return self._query(filters, page_num, assets_per_page)
+
+    def category_assets(self, category_path, page_num=1, filters=None,
+                        assets_per_page=DEFAULT_ASSETS_PER_PAGE):
+        """
+        Mirrors `NetX.category_assets` against the index.
+        """
+        if filters is None:  # Same default filters as `NetX.category_assets`
+            values_1 = '/'.join(
+                [entry['name'] for entry in category_path][1:])
+            filters = [
+                [SEARCH_TYPE_CATEGORY],
+                [CATEGORY_TYPE_ONLY],
+                [0],
+                [values_1],
+                [''],
+                [''],
+            ]
+        return self._query(filters, page_num, assets_per_page)
+
+    def _match_expression(self, query_type, value):
+        """
+        Returns an FTS5 match expression for a keyword filter.
+        """
+        words = ['"%s"' % word.replace('"', '""') for word in value.split()]
+        if query_type in (QUERY_TYPE_EXACT, QUERY_TYPE_PHRASE):
+            return '"%s"' % ' '.join(value.split()).replace('"', '""')
+        if query_type in (QUERY_TYPE_AND_FRAG, QUERY_TYPE_OR_FRAG):
+            words = [word + '*' for word in words]
+        if query_type in (QUERY_TYPE_OR, QUERY_TYPE_OR_FRAG):
+            return '(%s)' % ' OR '.join(words)
+        return '(%s)' % ' AND '.join(words)
+
+    def _keyword_clause(self, keywords):
+        """
+        Returns SQL and params matching any of the `(query_type, value)`
+        keyword filters.
+        """
+        if self.fts:
+            expression = ' OR '.join(
+                self._match_expression(query_type, value)
+                for query_type, value in keywords)
+            return (
+                'asset_id IN (SELECT rowid FROM assets_text '
+                'WHERE assets_text MATCH ?)', [expression])
+        clauses = []
+        params = []
+        for query_type, value in keywords:
+            for word in value.split():
+                clauses.append('(name LIKE ? OR metadata LIKE ?)')
+                params.extend(['%%%s%%' % word] * 2)
+        return (
+            'asset_id IN (SELECT rowid FROM assets_text WHERE %s)'
+            % ' OR '.join(clauses), params)
+
+    def _category_clause(self, query_type, path):
+        """
+        Returns SQL and params for a category filter.
+        """
+        exact = 'category_path = ?'
+        params = [path]
+        if query_type in RECURSIVE_CATEGORY_TYPES and not path:
+            exact = '1'  # Any category below the root
+            params = []
+        elif query_type in RECURSIVE_CATEGORY_TYPES:
+            exact = '(category_path = ? OR substr(category_path, 1, ?) = ?)'
+            params = [path, len(path) + 1, path + '/']
+        clause = (
+            'asset_id %%s (SELECT asset_id FROM asset_categories WHERE %s)'
+            % exact)
+        if query_type in EXCLUDE_CATEGORY_TYPES:
+            return clause % 'NOT IN', params
+        return clause % 'IN', params
+
+    def _synced(self, query_type, path):
+        """
+        Returns True if all assets of the category filter are indexed: the
+        category was synced, recursively for recursive filters, or one of its
+        parent categories was synced recursively.
+        """
+        parents = path.split('/')
+        paths = ['/'.join(parents[:i]) for i in range(len(parents))]
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT category_path, recursive FROM synced_categories
+                WHERE category_path IN (%s)
+                """ % ', '.join('?' * (len(paths) + 1)),
+                paths + [path]).fetchall()
+        for synced_path, recursive in rows:
+            if recursive or (
+                    synced_path == path and
+                    query_type not in RECURSIVE_CATEGORY_TYPES):
+                return True
+        return False
+
+    def _query(self, filters, page_num, assets_per_page):
+        """
+        Translates X7 search filters into SQL. Keyword and thesaurus filters
+        match if any of them matches, category filters must all match. Only
+        queries limited to synced categories, or any query once the root
+        category was synced recursively, are answered, as the index may hold
+        just some of the assets matching other queries.
+        """
+        keywords = []
+        limited = False
+        clauses = ['bean IS NOT NULL']
+        params = []
+        for search_type, query_type, _, value, _, _ in zip(*filters):
+            if (search_type in KEYWORD_SEARCH_TYPES and
+                    query_type in KEYWORD_QUERY_TYPES):
+                if value and value.split():
+                    keywords.append((query_type, value))
+            elif search_type == SEARCH_TYPE_CATEGORY:
+                if not self._synced(query_type, value):
+                    raise IndexMiss('category %s is not synced' % value)
+                if query_type not in EXCLUDE_CATEGORY_TYPES:
+                    limited = True
+                clause, clause_params = self._category_clause(
+                    query_type, value)
+                clauses.append(clause)
+                params.extend(clause_params)
+            else:
+                raise IndexMiss(
+                    'search type %s with query type %s is not indexed' % (
+                        search_type, query_type))
+        if not limited:
+            if not self._synced(CATEGORY_TYPE_RECURSIVE, ''):
+                raise IndexMiss('search is not limited to synced categories')
+            # Assets which left all categories since they were indexed are
+            # not listed.
+            clause, clause_params = self._category_clause(
+                CATEGORY_TYPE_RECURSIVE, '')
+            clauses.append(clause)
+            params.extend(clause_params)
+        if keywords:
+            clause, clause_params = self._keyword_clause(keywords)
+            clauses.append(clause)
+            params.extend(clause_params)
+
+        start_index = (page_num - 1) * assets_per_page
+        sql = (
+            'SELECT bean FROM assets WHERE %s '
+            'ORDER BY name DESC, asset_id DESC LIMIT ? OFFSET ?'
+            % ' AND '.join(clauses))
+        with self.lock:
+            rows = self.connection.execute(
+                sql, params + [assets_per_page, start_index]).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def sync(self, api, category_path, recursive=True):
+        """
+        Indexes all assets in the category denoted by `category_path` (a list
+        of category dicts starting with the root category, as accepted by
+        `NetX.category_assets`) and, if `recursive`, its sub categories.
+        Returns the number of assets indexed. Searches in the category are
+        answered by the index once the sync completes.
+        """
+        values_1 = '/'.join([entry['name'] for entry in category_path][1:])
+        with self.lock, self.connection:
+            # Assets may have left the category since the last sync.
+            self.connection.execute(
+                'DELETE FROM synced_categories WHERE category_path = ?',
+                (values_1,))
+            self.connection.execute(
+                'DELETE FROM asset_categories WHERE category_path = ?',
+                (values_1,))
+        count = 0
+        for page in api.pages(api.category_assets, category_path):
+            self.add_assets(page, category_path=values_1)
+            count += len(page)
+        if recursive:
+            for category in api.categories(category_path[-1]['id']):
+                count += self.sync(
+                    api, category_path + [category],
+                    recursive=bool(category['children']))
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO synced_categories VALUES (?, ?, ?)',
+                (values_1, int(recursive), int(time.time() * 1000)))
+        return count
@@ -1,95 +1,32 @@
 """
 Backend implementation for NetX Digital Asset Management.
+
+The HTTP stack (`requests`) is imported when the first request is sent rather
+than when this module is imported.
 """
 
 import json
 import logging
 import random
-import requests
+import re
+import threading
 import time
-from contextlib import closing
-requests.packages.urllib3.disable_warnings()
+import warnings
+from contextlib import closing, contextmanager
 
-from . import __version__
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Python 2
+    from urlparse import urlparse
 
-DEFAULT_ASSETS_PER_PAGE = 10
-DEFAULT_TIMEOUT = 60  # Requests timeout in seconds
-DEFAULT_REQUESTS_PER_SECOND = 1
-
-#
-# Constants for JSON-RPC X7 API
-#
-
-# Sort order
-SORT_ORDER_ASCENDING = 0
-SORT_ORDER_DESCENDING = 1
-
-# Search types
-SEARCH_TYPE_KEYWORDS = 1
-SEARCH_TYPE_CONTENTS = 2
-SEARCH_TYPE_METADATA = 3
-SEARCH_TYPE_DATE = 4
-SEARCH_TYPE_CATEGORY = 5
-SEARCH_TYPE_FILE_FORMAT = 6
-SEARCH_TYPE_FILE_SIZE = 7
-SEARCH_TYPE_RAW = 8
-SEARCH_TYPE_CUSTOM = 9
-SEARCH_TYPE_CART = 10
-SEARCH_TYPE_RELATED_ASSETS = 11
-SEARCH_TYPE_LAST_SEARCH = 12
-SEARCH_TYPE_CHECKOUT = 13
-SEARCH_TYPE_THESAURUS = 14
-SEARCH_TYPE_BRANCH_CHILDREN = 15
-SEARCH_TYPE_REVIEWS = 16
-SEARCH_TYPE_EXPIRE = 17
-SEARCH_TYPE_METADATA_HISTORY = 18
-SEARCH_TYPE_RATING = 19
-SEARCH_TYPE_LOCATION = 20
-SEARCH_TYPE_PROOF = 21
-SEARCH_TYPE_FILE_ASPECT = 22
-
-# Keyword/contents/metadata sub-types
-QUERY_TYPE_AND = 0
-QUERY_TYPE_EXACT = 1
-QUERY_TYPE_OR = 2
-QUERY_TYPE_NOT = 3
-QUERY_TYPE_AND_FRAG = 4
-QUERY_TYPE_OR_FRAG = 5
-QUERY_TYPE_RANGE = 6
-QUERY_TYPE_PHRASE = 7
-QUERY_TYPE_RAW = 8
-QUERY_TYPE_EMPTY = 9
-
-# Category sub-types 1
-CATEGORY_TYPE_ONLY_RECURSIVE = 0
-CATEGORY_TYPE_EXCLUDE_RECURSIVE = 1
-CATEGORY_TYPE_ONLY = 2
-CATEGORY_TYPE_EXCLUDE = 3
-CATEGORY_TYPE_RECURSIVE = 4
-
-# Notify types
-NOTIFY_TYPE_NONE = 0
-NOTIFY_TYPE_WEEKLY = 1
-NOTIFY_TYPE_DAILY = 2
-NOTIFY_TYPE_IMMEDIATELY = 3
+from . import __version__
+from .coalesce import AsyncSingleFlight, SingleFlight
+from .constants import *  # noqa, re-exported for backwards compatibility
+from .exceptions import ResponseError, SettingsError
 
 LOGGER = logging.getLogger(__name__)
 
 
-class SettingsError(Exception):
-    """
-    Exception used when backend settings are not configured.
-    """
-    pass
-
-
-class ResponseError(Exception):
-    """
-    Exception used when we receive unexpected response from origin server.
-    """
-    pass
-
-
 class NetX(object):
     """
     Implements the API endpoints for this backend.
@@ -111,13 +48,61 @@ class NetX(object):
         self.assets_per_page = settings.get(
             'ASSETS_PER_PAGE', DEFAULT_ASSETS_PER_PAGE)
         self.timeout = settings.get('TIMEOUT', DEFAULT_TIMEOUT)
+        self.connect_timeout = settings.get('CONNECT_TIMEOUT', self.timeout)
+        self.read_timeout = settings.get('READ_TIMEOUT', self.timeout)
+        self.hedger = None  # Hedges idempotent requests, see `netx.hedge`
+        if settings.get('HEDGE_REQUESTS', False):
+            from .hedge import Hedger
+            self.hedger = Hedger(
+                percentile=settings.get(
+                    'HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE),
+                budget=settings.get('HEDGE_BUDGET', DEFAULT_HEDGE_BUDGET),
+            )
+        self.verify_ssl = settings.get('VERIFY_SSL', False)
+        self.repurpose_chunk_size = settings.get(
+            'REPURPOSE_CHUNK_SIZE', DEFAULT_REPURPOSE_CHUNK_SIZE)
+        self.repurpose_timeout = settings.get(
+            'REPURPOSE_TIMEOUT', DEFAULT_REPURPOSE_TIMEOUT)
         self.requests_per_second = settings.get(
             'REQUESTS_PER_SECOND', DEFAULT_REQUESTS_PER_SECOND)
+        # Replaces the fixed limit, see `netx.ratelimit`
+        self.rate_limiter = settings.get('RATE_LIMITER', None)
+        if self.rate_limiter is None and settings.get('ADAPTIVE_RATE', False):
+            from .ratelimit import AdaptiveRateController
+            self.rate_limiter = AdaptiveRateController(
+                self.requests_per_second,
+                min_requests_per_second=settings.get(
+                    'MIN_REQUESTS_PER_SECOND',
+                    DEFAULT_MIN_REQUESTS_PER_SECOND),
+                max_requests_per_second=settings.get(
+                    'MAX_REQUESTS_PER_SECOND',
+                    DEFAULT_MAX_REQUESTS_PER_SECOND),
+                latency_target=settings.get('LATENCY_TARGET', None),
+            )
+        self.index = None  # Local asset index, see `netx.index`
+        self.index_reads = settings.get('LOCAL_INDEX_READS', False)
+        local_index = settings.get('LOCAL_INDEX', None)
+        if local_index is not None:
+            from .index import AssetIndex
+            if not isinstance(local_index, AssetIndex):
+                local_index = AssetIndex(local_index)
+            self.index = local_index
+        self.coalesce = settings.get('COALESCE_REQUESTS', True)
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
         data_type = settings.get('DATA_TYPE', 'x7/json/')
         self.label = self.__class__.__name__.lower()
         self.sent_nonce = None  # For use in JSON-RPC calls
         self.api_url = None
         self.last_request = None  # Epoch in ms for use to limit requests/sec
+        # Object with the `request` method of `requests.Session`, used to send
+        # requests, e.g. to record or replay traffic, see `netx.replay`
+        self._transport = settings.get('TRANSPORT', None)
+        self._insecure_request_warnings_ignored = False
+        self._priority = threading.local()  # See `background`
+        self._foreground_requests = 0
+        self._foreground_flights = {}  # Coalesced keys awaited in foreground
+        self._foreground_idle = threading.Condition()
         if self.root_url:
             self.api_url = '%s/%s' % (self.root_url, data_type)
 
@@ -133,6 +118,51 @@ class NetX(object):
             self._user = self.get_user()
         return self._user
 
+    @property
+    def transport(self):
+        """
+        HTTP session used to send requests. Created on first use, so that
+        `requests` is only imported once it is needed.
+        """
+        if self._transport is None:
+            import requests
+            self._transport = requests.Session()
+        return self._transport
+
+    @property
+    def current_rate(self):
+        """
+        Number of requests per second currently allowed, which changes over
+        time when `ADAPTIVE_RATE` is enabled.
+        """
+        if self.rate_limiter is not None:
+            return self.rate_limiter.requests_per_second
+        return self.requests_per_second
+
+    @property
+    def coalesced_calls(self):
+        """
+        Number of calls which shared the request of an identical concurrent
+        call instead of making their own.
+        """
+        return (
+            self.single_flight.coalesced + self.async_single_flight.coalesced)
+
+    def call_async(self, method, *args, **kwargs):
+        """
+        Returns an asyncio future for the result of calling `method`, e.g.
+        `await api.call_async('get_asset_info', asset_id)`. The call runs in
+        the default executor of the event loop, and identical concurrent
+        calls share one call.
+        """
+        fn = getattr(self, method)
+        if not self.coalesce:
+            import asyncio
+            return asyncio.get_event_loop().run_in_executor(
+                None, lambda: fn(*args, **kwargs))
+        key = (method, json.dumps([args, kwargs], sort_keys=True))
+        return self.async_single_flight.do(key, fn, *args, **kwargs)
+
     def _restore_connection(self):
         delattr(self, '_session_key')
         delattr(self, '_user')
@@ -159,6 +189,9 @@ class NetX(object):
         """
         Limit number of outgoing requests per second.
         """
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+            return
         if self.last_request is None:
             return
         rps = float(self.requests_per_second)
@@ -170,10 +203,157 @@ class NetX(object):
             elapsed_ms = now_ms - self.last_request
         return
 
+    def _ignore_insecure_request_warnings(self):
+        """
+        Ignores warnings about unverified HTTPS requests to the origin server
+        of this instance only, rather than to any host.
+        """
+        if self._insecure_request_warnings_ignored:
+            return
+        from requests.packages.urllib3.exceptions import InsecureRequestWarning
+        host = urlparse(self.root_url or '').hostname or ''
+        warnings.filterwarnings(
+            'ignore',
+            message="Unverified HTTPS request is being made to host '%s'"
+            % re.escape(host),
+            category=InsecureRequestWarning)
+        self._insecure_request_warnings_ignored = True
+
+    @contextmanager
+    def background(self):
+        """
+        Context manager marking the requests sent by the current thread as
+        background requests, e.g. for prefetching. Background requests are
+        only sent while no other requests are being sent.
+        """
+        background = getattr(self._priority, 'background', False)
+        self._priority.background = True
+        try:
+            yield
+        finally:
+            self._priority.background = background
+
+    def _send(self, method, url, hedge=False, kind=None, **kwargs):
+        """
+        Sends an HTTP request with the transport, giving way to foreground
+        requests if it is a background request. Idempotent requests may be
+        hedged (see `netx.hedge`) if `hedge` is True, after a delay for
+        requests of the same `kind`. Returns the HTTP response.
+        """
+        kwargs.setdefault('verify', self.verify_ssl)
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        if not kwargs['verify']:
+            self._ignore_insecure_request_warnings()
+
+        if getattr(self._priority, 'background', False):
+            # A background call which a foreground caller waits for (see
+            # `_coalesced`) is promoted to a foreground request.
+            flight = getattr(self._priority, 'flight', None)
+            with self._foreground_idle:
+                while (self._foreground_requests and
+                       flight not in self._foreground_flights):
+                    self._foreground_idle.wait()
+                promoted = flight in self._foreground_flights
+            if not promoted:
+                return self._request(method, url, hedge, kind, **kwargs)
+
+        with self._foreground_idle:
+            self._foreground_requests += 1
+        try:
+            return self._request(method, url, hedge, kind, **kwargs)
+        finally:
+            with self._foreground_idle:
+                self._foreground_requests -= 1
+                if not self._foreground_requests:
+                    self._foreground_idle.notify_all()
+
+    def _request(self, method, url, hedge=False, kind=None, **kwargs):
+        """
+        Sends an HTTP request with the transport, feeding back its latency
+        and overload errors to the rate limiter. The latency of GET requests
+        is the time to the response headers, not to download the file.
+        Returns the HTTP response.
+        """
+        if hedge and self.hedger is not None:
+            # Stream so that the response of the losing request can be
+            # closed without downloading its content.
+            kwargs['stream'] = True
+
+            def send_hedge():
+                self._requests_limiter()  # Hedges count against the rate
+                return self._request(method, url, **kwargs)
+            return self.hedger.call(
+                lambda: self._request(method, url, **kwargs), send_hedge,
+                kind=kind)
+
+        record = getattr(self.rate_limiter, 'record', None)
+        if record is None:
+            return self.transport.request(method, url, **kwargs)
+
+        if method == 'GET':
+            kwargs['stream'] = True  # The caller reads the content later.
+        start = time.time()
+        try:
+            response = self.transport.request(method, url, **kwargs)
+        except Exception:
+            record(time.time() - start, error=True)
+            raise
+        record(
+            time.time() - start,
+            error=response.status_code == 429 or response.status_code >= 500)
+        return response
+
     def _get(self, url, params=None, **kwargs):
         """
         Wraps HTTP GET request with the specified params. Returns the HTTP
-        response.
+        response. Identical concurrent requests share one request.
+        """
+        if self.coalesce:
+            key = ('GET', url, json.dumps(params, sort_keys=True))
+            return self._coalesced(
+                key, self._send_get, url, params=params, **kwargs)
+        return self._send_get(url, params=params, **kwargs)
+
+    def _coalesced(self, key, fn, *args, **kwargs):
+        """
+        Calls `fn(*args, **kwargs)` unless an identical call for `key` is in
+        flight, see `SingleFlight`. A foreground caller waiting for a
+        background call promotes it, so it does not give way to other
+        foreground requests.
+        """
+        if getattr(self._priority, 'background', False):
+            flight = getattr(self._priority, 'flight', None)
+            self._priority.flight = key  # Checked by `_send`
+            try:
+                return self.single_flight.do(key, fn, *args, **kwargs)
+            finally:
+                self._priority.flight = flight
+
+        with self._foreground_idle:
+            self._foreground_flights[key] = (
+                self._foreground_flights.get(key, 0) + 1)
+            self._foreground_idle.notify_all()
+        try:
+            return self.single_flight.do(key, fn, *args, **kwargs)
+        finally:
+            with self._foreground_idle:
+                self._foreground_flights[key] -= 1
+                if not self._foreground_flights[key]:
+                    del self._foreground_flights[key]
+
+    def _send_get(self, url, params=None, **kwargs):
+        with closing(self._open_get(url, params=params, **kwargs)) as response:
+            if kwargs.get('stream'):
+                filesize = response.headers.get('content-length')
+                if filesize is not None:
+                    LOGGER.info('streaming %s: %.2fKB', url,
+                                float(filesize) / 1024)
+            return (response.headers, response.content)  # Read or stream now.
+
+    def _open_get(self, url, params=None, **kwargs):
+        """
+        Sends HTTP GET request with the specified params. Returns the HTTP
+        response, which the caller must close.
         """
         headers = {
             'user-agent': 'python-netx/%s' % __version__,
@@ -185,36 +365,42 @@ class NetX(object):
             headers=headers,
             params=params,
             cookies=cookies,
-            verify=False,
-            timeout=self.timeout,
         ))
-        response_headers = None
-        response_content = None
         self._requests_limiter()
-        with closing(requests.get(url, **kwargs)) as response:
-            if response.status_code != 200:
-                raise ResponseError(
-                    '%s returned HTTP%d' % (url, response.status_code))
-            self.last_request = int(time.time() * 1000)
-            if kwargs.get('stream'):
-                filesize = float(response.headers['content-length']) / 1024
-                LOGGER.info('streaming %s: %.2fKB', url, filesize)
-            response_headers = response.headers
-            response_content = response.content  # Read or stream now.
-        return (response_headers, response_content)
+        # Requests for renditions of different assets are of one kind.
+        kind = 'GET ' + re.sub(r'/\d+(?=/|$)', '/*', urlparse(url).path)
+        response = self._send('GET', url, hedge=True, kind=kind, **kwargs)
+        if response.status_code != 200:
+            response.close()
+            raise ResponseError(
+                '%s returned HTTP%d' % (url, response.status_code))
+        self.last_request = int(time.time() * 1000)
+        return response
 
     def _json_post(self, context, retries=3):
         """
         Wraps HTTP POST request with the specified data. Returns dict decoded
-        from the JSON response.
+        from the JSON response. Identical concurrent calls to methods in
+        `IDEMPOTENT_METHODS` share one request.
         """
+        if self.coalesce and context['method'] in IDEMPOTENT_METHODS:
+            key = ('POST', context['method'], json.dumps(
+                context.get('params'), sort_keys=True))
+            return self._coalesced(
+                key, self._send_json_post, context, retries=retries)
+        return self._send_json_post(context, retries=retries)
+
+    def _send_json_post(self, context, retries=3):
+        import requests
+
         cookies = None
         if context['method'] != 'authenticate':
             cookies = {
                 'sessionKey': self.session_key,
             }
+        sent_nonce = self._nonce()
         data = {
-            'id': self._nonce(),
+            'id': sent_nonce,
             'dataContext': 'json',
             'jsonrpc': '2.0',
         }
@@ -229,13 +415,14 @@ class NetX(object):
         # Retry if we get intermittent connection error
         self._requests_limiter()
         try:
-            response = requests.post(
-                url, headers=headers, data=data, cookies=cookies, verify=False,
-                timeout=self.timeout)
+            response = self._send(
+                'POST', url, headers=headers, data=data, cookies=cookies,
+                hedge=context['method'] in IDEMPOTENT_METHODS,
+                kind=context['method'])
         except requests.exceptions.ConnectionError as err:
             if context['method'] != 'authenticate' and retries > 1:
                 LOGGER.info('retry (%d): %s', retries - 1, context)
-                self._json_post(context, retries=retries - 1)
+                return self._send_json_post(context, retries=retries - 1)
             else:
                 raise ResponseError(err)
 
@@ -245,11 +432,11 @@ class NetX(object):
         self.last_request = int(time.time() * 1000)
         response = response.json()
         nonce = response.get('id', None)
-        if nonce != self.sent_nonce:
+        if nonce != sent_nonce:
             raise ResponseError(
                 'Mismatched nonce: %s != %s\n'
                 'Request: %s\n'
-                'Response: %s' % (nonce, self.sent_nonce, data, response))
+                'Response: %s' % (nonce, sent_nonce, data, response))
         # Reraise exception returned by origin server
         error = response.get('error', None)
         if error:
@@ -258,7 +445,7 @@ class NetX(object):
             # Retry if we have a stale connection
             if context['method'] != 'authenticate' and retries > 1:
                 self._restore_connection()
-                return self._json_post(context, retries=retries - 1)
+                return self._send_json_post(context, retries=retries - 1)
             else:
                 raise ResponseError(msg)
 
@@ -353,7 +540,8 @@ class NetX(object):
         #     ],                          # values 2
         #     ['', ''],                   # values 3
         # ]
-        if filters is None:  # Use default filters
+        default_filters = filters is None
+        if default_filters:
             filters = [
                 [SEARCH_TYPE_CATEGORY],     # types
                 [CATEGORY_TYPE_ONLY],       # sub-types 1
@@ -380,7 +568,12 @@ class NetX(object):
             'params': params,
         }
         response = self._json_post(context=context)
-        return response.get('result')
+        result = response.get('result')
+        if self.index is not None and default_filters:
+            self.index.add_assets(result, category_path=values_1)
+        elif self.index is not None:
+            self.index.add_assets(result)
+        return result
 
     def carts(self):
         """
@@ -456,7 +649,16 @@ class NetX(object):
         Sends getAssetBean command to get asset info with `attributeNames` and
         `attributeValues` appearing in key-value format instead of two separate
         lists.
+
+        When `LOCAL_INDEX_READS` is enabled the asset info is served from the
+        local index if it is there.
         """
+        if self.index is not None and self.index_reads:
+            from .index import IndexMiss
+            try:
+                return self.index.get_asset_info(asset_id)
+            except IndexMiss:
+                pass
         context = {
             'method': 'getAssetBean',
             'params': [asset_id],
@@ -467,13 +669,26 @@ class NetX(object):
         del result['attributeNames']
         del result['attributeValues']
         result['attributes'] = attrs
+        if self.index is not None:
+            self.index.add_asset_info(result)
         return result
 
     def search(self, keyword, page_num=1, filters=None):
         """
         Sends searchAssetBeanObjects command to search assets based on the
         given keyword. Results are paginated.
+
+        When `LOCAL_INDEX_READS` is enabled the results are served from the
+        local index if it can answer the query.
         """
+        if self.index is not None and self.index_reads:
+            from .index import IndexMiss
+            try:
+                return self.index.search(
+                    keyword, page_num, filters, self.assets_per_page)
+            except IndexMiss:
+                pass
+
         start_index = ((page_num - 1) * self.assets_per_page) + 1
 
         # Example filters to exclude assets with:
@@ -535,7 +750,25 @@ class NetX(object):
             'params': params,
         }
         response = self._json_post(context=context)
-        return response.get('result')
+        result = response.get('result')
+        if self.index is not None:
+            self.index.add_assets(result)
+        return result
+
+    def pages(self, fetch, *args, **kwargs):
+        """
+        Yields successive pages of results from the paginated method `fetch`,
+        e.g. `self.pages(self.search, 'keyword')`, until an empty or partial
+        page is returned.
+        """
+        page_num = 1
+        while True:
+            page = fetch(*args, page_num=page_num, **kwargs) or []
+            if page:
+                yield page
+            if len(page) < self.assets_per_page:
+                return
+            page_num += 1
 
     def file_url(self, asset_id, data='zoom'):
         return self.root_url + '/file/asset/' + str(asset_id) + '/' + data
@@ -556,6 +789,24 @@ class NetX(object):
         headers, content = self._get(url, stream=stream)
         return (headers, content)
 
+    def file_chunks(self, asset_id, data='zoom',
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Downloads the asset like `file` without holding the whole file in
+        memory. Returns a tuple containing the response header and an
+        iterator over chunks of the content, which closes the response once
+        exhausted.
+        """
+        response = self._open_get(
+            self.file_url(asset_id, data), stream=True)
+
+        def chunks():
+            with closing(response):
+                for chunk in response.iter_content(chunk_size):
+                    if chunk:
+                        yield chunk
+        return (response.headers, chunks())
+
     def prepare_asset_with_preset(self, asset_id, preset=2):
         """
         Sends repurposeAssetsWithPresetProcess command to initiate creation
@@ -613,6 +864,179 @@ class NetX(object):
             raise ResponseError("Pseudo HTTP403: NetX did not want to repurpose asset %s" % asset_id)
         return result
 
+    def repurpose_availability(self, asset_ids):
+        """
+        Sends getAssetObjects command for all the given assets at once.
+        Returns dict mapping the asset ids to whether they can be repurposed,
+        leaving out assets the origin server did not tell us about.
+        """
+        asset_ids = list(asset_ids)
+        context = {
+            'method': 'getAssetObjects',
+            'params': [asset_ids],
+        }
+        response = self._json_post(context=context)
+        result = response.get('result') or []
+        # Asset ids as given, by their string form, as the origin server may
+        # leave out or reorder assets.
+        given_ids = dict((str(asset_id), asset_id) for asset_id in asset_ids)
+        availability = {}
+        for asset in result:
+            if not asset or 'repurposeAvailability' not in asset:
+                continue
+            asset_id = given_ids.get(str(asset.get('assetId')))
+            if asset_id is not None:
+                availability[asset_id] = asset['repurposeAvailability']
+        return availability
+
+    def _wait_for_job(self, poll_interval, timeout):
+        """
+        Polls the progress of the last job until it completes. Returns the
+        progress, or None if the job did not complete within `timeout`
+        seconds.
+        """
+        deadline = time.time() + timeout
+        progress = self.progress() or {}  # Result may be null
+        while progress.get('percentComplete', 0) < 100:
+            if time.time() + poll_interval > deadline:
+                return None
+            time.sleep(poll_interval)
+            progress = self.progress() or {}
+        return progress
+
+    def _prepare_assets(self, asset_ids, method, params, chunk_size=None,
+                        poll_interval=1, timeout=None):
+        """
+        Checks which of the assets can be repurposed and sends `method` with
+        `params` for the eligible ones in chunks of `chunk_size` assets, one
+        job at a time, waiting up to `timeout` seconds for each job to
+        complete.
+        """
+        if chunk_size is None:
+            chunk_size = self.repurpose_chunk_size
+        if timeout is None:
+            timeout = self.repurpose_timeout
+        asset_ids = list(asset_ids)
+        availability = self.repurpose_availability(asset_ids)
+
+        assets = {}
+        eligible = []
+        for asset_id in asset_ids:
+            if asset_id not in availability:
+                assets[asset_id] = {
+                    'status': 'skipped',
+                    'reason': 'NetX did not tell whether it can repurpose '
+                              'the asset',
+                    'job': None,
+                }
+            elif not availability[asset_id]:
+                assets[asset_id] = {
+                    'status': 'skipped',
+                    'reason': "Repurpose not available (usually because the "
+                              "image isn't available)",
+                    'job': None,
+                }
+            elif asset_id not in assets:
+                assets[asset_id] = None
+                eligible.append(asset_id)
+
+        jobs = []
+        for start in range(0, len(eligible), chunk_size):
+            chunk = eligible[start:start + chunk_size]
+            context = {
+                'method': method,
+                'params': [
+                    chunk,  # asset ids
+                    [],     # other ids
+                ] + params,
+            }
+            response = self._json_post(context=context)
+            if not response.get('result'):
+                for asset_id in chunk:
+                    assets[asset_id] = {
+                        'status': 'failed',
+                        'reason': 'NetX did not want to repurpose the assets',
+                        'job': None,
+                    }
+                continue
+
+            # Progress and prepared asset are those of the last job, so jobs
+            # are run one at a time.
+            progress = self._wait_for_job(poll_interval, timeout)
+            if progress is None:
+                for asset_id in chunk:
+                    assets[asset_id] = {
+                        'status': 'failed',
+                        'reason': 'The repurpose job did not complete '
+                                  'within %s seconds' % timeout,
+                        'job': None,
+                    }
+                continue
+            job = {
+                'asset_ids': chunk,
+                'progress': progress,
+                'prepared_asset': self.get_prepared_asset(),
+            }
+            for asset_id in chunk:
+                assets[asset_id] = {
+                    'status': 'prepared',
+                    'reason': None,
+                    'job': len(jobs),
+                }
+            jobs.append(job)
+        return {'assets': assets, 'jobs': jobs}
+
+    def prepare_assets_with_preset(self, asset_ids, preset=2, chunk_size=None,
+                                   poll_interval=1, timeout=None):
+        """
+        Batch version of `prepare_asset_with_preset`. Checks repurpose
+        availability of all assets with one getAssetObjects command, then
+        sends repurposeAssetsWithPresetProcess command for the eligible assets
+        in chunks of `chunk_size` (default `REPURPOSE_CHUNK_SIZE`) assets and
+        waits for each job to complete. The assets of a job which does not
+        complete within `timeout` seconds (default `REPURPOSE_TIMEOUT`) are
+        marked as failed.
+
+        Returns dict containing the outcome per asset id and the jobs, whose
+        index is referred to by the outcomes of the prepared assets.
+
+        Example:
+        {
+            'assets': {
+                1: {'status': 'prepared', 'reason': None, 'job': 0},
+                2: {'status': 'skipped', 'reason': '...', 'job': None},
+            },
+            'jobs': [
+                {
+                    'asset_ids': [1],
+                    'progress': {'percentComplete': 100, ...},
+                    'prepared_asset': {'path': '/session/...', ...},
+                },
+            ],
+        }
+        """
+        return self._prepare_assets(
+            asset_ids, 'repurposeAssetsWithPresetProcess', [
+                preset,  # preset id, 2 for 'Large JPEG (5x7)'
+                '',      # download override, e.g. 'thumb', 'preview'
+            ], chunk_size=chunk_size, poll_interval=poll_interval,
+            timeout=timeout)
+
+    def prepare_assets_with_params(self, asset_ids, params, values,
+                                   chunk_size=None, poll_interval=1,
+                                   timeout=None):
+        """
+        Batch version of `prepare_asset_with_params`, which sends
+        repurposeAssets command for the eligible assets in chunks. Returns
+        the same as `prepare_assets_with_preset`.
+        """
+        return self._prepare_assets(
+            asset_ids, 'repurposeAssets', [
+                params,  # ex: ['height', 'dpi']
+                values,  # ex: [1000, 300]
+            ], chunk_size=chunk_size, poll_interval=poll_interval,
+            timeout=timeout)
+
     def progress(self):
         """
         Sends getProgressReport command to get progress of the last job, e.g.
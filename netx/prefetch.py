@@ -0,0 +1,203 @@
+"""
+Prefetching of paginated listings and warm-up of asset renditions.
+
+When a page of a listing is requested through a `Prefetcher`, the next page
+and the renditions of the assets on the requested page are fetched in the
+background, so that they are at hand when the user asks for them.
+
+Usage example:
+```
+    prefetcher = Prefetcher(api)
+    assets = prefetcher.page(api.search, 1, 'keyword')
+    headers, content = prefetcher.file(assets[0]['assetId'], 'thumb')
+```
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_PAGE_BYTES = 8 * 1024 * 1024  # Budget per page turn
+DEFAULT_PAGE_REQUESTS = 50  # Budget per page turn
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RenditionCache(object):
+    """
+    In-memory cache of downloaded renditions, evicting the least recently
+    used renditions beyond `max_bytes`. Safe to share between threads.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        """
+        Returns the `(headers, content)` tuple cached for `key`, or None.
+        """
+        with self.lock:
+            value = self.entries.pop(key, None)
+            if value is not None:
+                self.entries[key] = value  # Most recently used
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[1])
+            if len(value[1]) > self.max_bytes:
+                return
+            self.entries[key] = value
+            self.bytes += len(value[1])
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted[1])
+
+
+class Prefetcher(object):
+    """
+    Fetches the next page of listings and warms the cache with renditions
+    of the assets on the current page in a background thread.
+
+    Background requests give way to foreground requests (see
+    `NetX.background`) and each page turn allows at most `page_requests`
+    background requests and `page_bytes` downloaded bytes. Work left over
+    from the previous page turn is dropped.
+    """
+    def __init__(self, api, renditions=('thumb', 'preview'), cache=None,
+                 page_requests=DEFAULT_PAGE_REQUESTS,
+                 page_bytes=DEFAULT_PAGE_BYTES):
+        self.api = api
+        self.renditions = renditions
+        self.cache = cache if cache is not None else RenditionCache()
+        self.page_requests = page_requests
+        self.page_bytes = page_bytes
+        self.pages = {}  # Prefetched pages
+        self.generation = 0  # Incremented on each page turn
+        self.budget = {'requests': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        """
+        Stops the background thread.
+        """
+        self.tasks.put(None)
+        self.thread.join()
+
+    def _page_key(self, fetch, page_num, args, kwargs):
+        return (fetch.__name__, page_num, json.dumps(
+            [args, kwargs], sort_keys=True, default=repr))
+
+    def page(self, fetch, page_num, *args, **kwargs):
+        """
+        Returns the page `page_num` of a paginated listing, e.g.
+        `prefetcher.page(api.search, 2, 'keyword')` for
+        `api.search('keyword', page_num=2)`. Prefetches the next page and the
+        renditions of the assets on this page in the background.
+        """
+        key = self._page_key(fetch, page_num, args, kwargs)
+        with self.lock:
+            assets = self.pages.pop(key, None)
+            self.pages.clear()
+            self.generation += 1
+            self.budget = {
+                'requests': self.page_requests,
+                'bytes': self.page_bytes,
+            }
+            generation = self.generation
+        if assets is None:
+            assets = fetch(*args, page_num=page_num, **kwargs) or []
+
+        # Thumbnails of this page are likely needed first, then the next page
+        # and then larger renditions.
+        asset_ids = [asset['assetId'] for asset in assets]
+        for rendition in self.renditions[:1]:
+            for asset_id in asset_ids:
+                self.tasks.put((generation, 'file', (asset_id, rendition)))
+        if len(assets) >= self.api.assets_per_page:
+            self.tasks.put((generation, 'page', (
+                fetch, page_num + 1, args, kwargs)))
+        for rendition in self.renditions[1:]:
+            for asset_id in asset_ids:
+                self.tasks.put((generation, 'file', (asset_id, rendition)))
+        return assets
+
+    def file(self, asset_id, data='zoom', stream=False):
+        """
+        Returns the rendition of the asset from the cache, or downloads it
+        with `NetX.file` and caches it.
+        """
+        key = (asset_id, data)
+        value = self.cache.get(key)
+        if value is None:
+            value = self.api.file(asset_id, data=data, stream=stream)
+            self.cache.set(key, value)
+        return value
+
+    def _reserve(self, generation):
+        """
+        Reserves a request from the budget of `generation`. Returns False if
+        the budget is exhausted or the generation is stale.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return False
+            if self.budget['requests'] <= 0 or self.budget['bytes'] <= 0:
+                return False
+            self.budget['requests'] -= 1
+            return True
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            generation, kind, args = task
+            try:
+                with self.api.background():
+                    if kind == 'file':
+                        self._prefetch_file(generation, *args)
+                    else:
+                        self._prefetch_page(generation, *args)
+            except Exception:
+                LOGGER.warning('prefetch failed: %s %s', kind, args,
+                               exc_info=True)
+
+    def _prefetch_file(self, generation, asset_id, rendition):
+        if (asset_id, rendition) in self.cache:
+            return
+        if not self._reserve(generation):
+            return
+        value = self.api.file(asset_id, data=rendition)
+        self.cache.set((asset_id, rendition), value)
+        with self.lock:
+            if generation == self.generation:
+                self.budget['bytes'] -= len(value[1])
+
+    def _prefetch_page(self, generation, fetch, page_num, args, kwargs):
+        if not self._reserve(generation):
+            return
+        assets = fetch(*args, page_num=page_num, **kwargs) or []
+        with self.lock:
+            if generation == self.generation:
+                key = self._page_key(fetch, page_num, args, kwargs)
+                self.pages[key] = assets
@@ -0,0 +1,130 @@
+"""
+Rate limiters which can be given to `NetX` with the `RATE_LIMITER` setting
+in place of its own fixed limit on requests per second.
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SharedRateLimiter(object):
+    """
+    Limits the rate of requests made by all processes sharing the limiter.
+    Create it in the parent process and hand it to child processes when they
+    are created, e.g. as an argument of a `multiprocessing.Pool` initializer.
+    """
+    def __init__(self, requests_per_second):
+        self.requests_per_second = float(requests_per_second)
+        # Epoch in seconds from when the next request may be made.
+        self.next_request = multiprocessing.Value('d', 0.0)
+
+    def wait(self):
+        """
+        Blocks until the next request may be made.
+        """
+        with self.next_request.get_lock():
+            now = time.time()
+            slot = max(now, self.next_request.value)
+            self.next_request.value = slot + 1 / self.requests_per_second
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class AdaptiveRateController(object):
+    """
+    Adjusts the rate of requests to the latency and errors of the responses
+    (additive increase, multiplicative decrease). Safe to share between
+    threads.
+
+    After each window of successful responses the rate is increased by
+    `increase` requests per second, unless the 95th percentile latency of the
+    window exceeds `latency_target` seconds or, without a target, rises
+    above `latency_tolerance` times its running average. A timeout,
+    connection error, HTTP429 or HTTP5xx response, or a rise in latency
+    multiplies the rate by `decrease`, at most once per `cooldown` seconds.
+    The rate stays between `min_requests_per_second` and
+    `max_requests_per_second`.
+    """
+    def __init__(self, requests_per_second=1, min_requests_per_second=0.2,
+                 max_requests_per_second=20, increase=0.5, decrease=0.5,
+                 window=20, latency_target=None, latency_tolerance=2.0,
+                 cooldown=1.0):
+        self.min_requests_per_second = float(min_requests_per_second)
+        self.max_requests_per_second = float(max_requests_per_second)
+        self.requests_per_second = self._clamp(float(requests_per_second))
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.latencies = []
+        self.latency_p95 = None  # 95th percentile latency of last window
+        self.latency_average = None  # Running average of `latency_p95`
+        self.last_decrease = 0.0
+        self.next_request = 0.0
+        self.lock = threading.Lock()
+
+    def _clamp(self, requests_per_second):
+        return min(
+            max(requests_per_second, self.min_requests_per_second),
+            self.max_requests_per_second)
+
+    def wait(self):
+        """
+        Blocks until the next request may be made at the current rate.
+        """
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_request)
+            self.next_request = slot + 1 / self.requests_per_second
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _decrease(self, now):
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.latencies = []
+        self.requests_per_second = self._clamp(
+            self.requests_per_second * self.decrease)
+        LOGGER.info(
+            'decreased rate to %.2f requests/s', self.requests_per_second)
+
+    def record(self, latency, error=False):
+        """
+        Records the latency in seconds of a response, and whether it failed
+        in a way which suggests that the origin server is overloaded.
+        """
+        with self.lock:
+            now = time.time()
+            if error:
+                self._decrease(now)
+                return
+            self.latencies.append(latency)
+            if len(self.latencies) < self.window:
+                return
+            latencies = sorted(self.latencies)
+            self.latencies = []
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            self.latency_p95 = p95
+            if self.latency_target is not None:
+                healthy = p95 <= self.latency_target
+            else:
+                healthy = (
+                    self.latency_average is None or
+                    p95 <= self.latency_average * self.latency_tolerance)
+                if self.latency_average is None:
+                    self.latency_average = p95
+                else:
+                    self.latency_average = (
+                        0.9 * self.latency_average + 0.1 * p95)
+            if healthy:
+                self.requests_per_second = self._clamp(
+                    self.requests_per_second + self.increase)
+            else:
+                self._decrease(now)
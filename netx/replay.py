@@ -0,0 +1,248 @@
+"""
+Record and replay NetX traffic, e.g. for deterministic load tests and
+profiling without touching a production server.
+
+`RecordingTransport` sends requests with a real transport and records the
+request/response pairs into a gzipped JSON Lines archive, with credentials
+and session keys redacted. `ReplayTransport` serves the recorded responses
+back, each after its original or accelerated latency. Only the latency of
+each response is replayed, not when the requests were sent: the caller
+sends the requests, at the rate and concurrency of the test. Both are given
+to `NetX` with the `TRANSPORT` setting.
+
+Usage example:
+```
+    recorder = RecordingTransport('traffic.jsonl.gz')
+    api = NetX(dict(settings, TRANSPORT=recorder))
+    ...
+    recorder.close()
+
+    api = NetX(dict(settings, TRANSPORT=ReplayTransport('traffic.jsonl.gz')))
+```
+"""
+
+import base64
+import gzip
+import json
+import threading
+import time
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from urlparse import urlsplit
+
+ARCHIVE_FORMAT = 'netx-replay'
+ARCHIVE_VERSION = 1
+REDACTED = 'REDACTED'
+# Response headers which are not recorded, as they hold cookies or describe
+# the encoding of the content rather than the recorded (decoded) content.
+UNRECORDED_HEADERS = frozenset([
+    'content-encoding',
+    'content-length',
+    'set-cookie',
+    'transfer-encoding',
+])
+
+
+class ReplayMiss(LookupError):
+    """
+    Exception used when no recorded response matches a replayed request.
+    """
+    pass
+
+
+class ReplayResponse(object):
+    """
+    Recorded response, with the parts of `requests.Response` used by NetX.
+    """
+    def __init__(self, status_code, headers, content):
+        from requests.structures import CaseInsensitiveDict
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _rpc(data):
+    """
+    Returns the JSON-RPC request encoded in `data`, or None.
+    """
+    if not data:
+        return None
+    try:
+        rpc = json.loads(data)
+    except ValueError:
+        return None
+    return rpc if isinstance(rpc, dict) and 'method' in rpc else None
+
+
+def _key(method, url, params=None, data=None):
+    """
+    Returns the key matching a replayed request to recorded responses. The
+    key leaves out the host, so an archive can be replayed against any URL,
+    as well as the JSON-RPC nonce and the credentials.
+    """
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    rpc = _rpc(data)
+    if rpc is not None:
+        rpc_params = rpc.get('params')
+        if rpc['method'] == 'authenticate':
+            rpc_params = [REDACTED] * len(rpc_params or [])
+        body = [rpc['method'], rpc_params]
+    else:
+        body = data
+    return json.dumps(
+        [method.upper(), path, params, body], sort_keys=True,
+        separators=(',', ':'))
+
+
+class RecordingTransport(object):
+    """
+    Sends requests with `transport` (by default a new `requests.Session`)
+    and records them into the gzipped JSON Lines archive at `path`. Call
+    `close` when done. Safe to share between threads.
+
+    Each request is recorded with its `offset` in seconds from the start of
+    the recording and the `elapsed` seconds until its content was read.
+
+    Cookies and request headers are not recorded. Credentials sent with the
+    authenticate command and session keys it returns are redacted wherever
+    they appear.
+    """
+    def __init__(self, path, transport=None):
+        if transport is None:
+            import requests
+            transport = requests.Session()
+        self.transport = transport
+        self.start = time.time()
+        self.secrets = set()  # Session keys to redact
+        self.lock = threading.Lock()
+        self.archive = gzip.open(path, 'wb')
+        self._write({'format': ARCHIVE_FORMAT, 'version': ARCHIVE_VERSION})
+
+    def close(self):
+        with self.lock:
+            self.archive.close()
+
+    def _write(self, record):
+        line = json.dumps(record, sort_keys=True, separators=(',', ':'))
+        self.archive.write(line.encode('utf-8') + b'\n')
+
+    def _redact(self, value):
+        if isinstance(value, dict):
+            return dict((k, self._redact(v)) for k, v in value.items())
+        if isinstance(value, list):
+            return [self._redact(v) for v in value]
+        if isinstance(value, (str, type(u''))):
+            for secret in self.secrets:
+                value = value.replace(secret, REDACTED)
+        return value
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        offset = time.time() - self.start
+        response = self.transport.request(
+            method, url, params=params, data=data, **kwargs)
+        content = response.content  # Read now to time the whole response
+        elapsed = time.time() - self.start - offset
+
+        record = {
+            'offset': offset,
+            'elapsed': elapsed,
+            'method': method,
+            'url': url,
+            'params': params,
+            'status': response.status_code,
+            'headers': dict(
+                (k, v) for k, v in response.headers.items()
+                if k.lower() not in UNRECORDED_HEADERS),
+        }
+        rpc = _rpc(data)
+        if rpc is not None:
+            rpc.pop('id', None)
+            if rpc['method'] == 'authenticate':
+                rpc['params'] = [REDACTED] * len(rpc.get('params') or [])
+            record['rpc'] = rpc
+        elif data is not None:
+            record['data'] = data
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            record['content'] = base64.b64encode(content).decode('ascii')
+        else:
+            body.pop('id', None)
+            if (rpc is not None and rpc['method'] == 'authenticate' and
+                    body.get('result')):
+                with self.lock:
+                    self.secrets.add(body['result'])
+            record['json'] = body
+
+        with self.lock:
+            self._write(self._redact(record))
+        return response
+
+
+class ReplayTransport(object):
+    """
+    Serves responses recorded by `RecordingTransport` from the archive at
+    `path`. Each response is delayed by its recorded latency (`elapsed`)
+    divided by `speed`, or not delayed if `speed` is None. The recorded
+    `offset` of requests from the start of the recording is not replayed.
+    Identical requests get the recorded responses in turn, starting over
+    when they run out. Safe to share between threads.
+    """
+    def __init__(self, path, speed=1.0):
+        self.speed = speed
+        self.entries = []
+        self.responses = {}
+        self.lock = threading.Lock()
+        with gzip.open(path, 'rb') as archive:
+            header = json.loads(archive.readline().decode('utf-8'))
+            if header.get('format') != ARCHIVE_FORMAT:
+                raise ValueError('%s is not a NetX replay archive.' % path)
+            for line in archive:
+                entry = json.loads(line.decode('utf-8'))
+                self.entries.append(entry)
+                data = entry.get('data')
+                if 'rpc' in entry:
+                    data = json.dumps(entry['rpc'])
+                key = _key(
+                    entry['method'], entry['url'], entry['params'], data)
+                self.responses.setdefault(key, []).append(entry)
+        self.turns = dict.fromkeys(self.responses, 0)
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        key = _key(method, url, params, data)
+        with self.lock:
+            entries = self.responses.get(key)
+            if not entries:
+                raise ReplayMiss('No recorded response for %s %s %s' % (
+                    method, url, data or params or ''))
+            entry = entries[self.turns[key] % len(entries)]
+            self.turns[key] += 1
+
+        if 'json' in entry:
+            body = dict(entry['json'])
+            rpc = _rpc(data)
+            if rpc is not None and 'id' in rpc:
+                body['id'] = rpc['id']  # Echo the nonce of this request
+            content = json.dumps(body).encode('utf-8')
+        else:
+            content = base64.b64decode(entry['content'])
+        if self.speed:
+            time.sleep(entry['elapsed'] / self.speed)
+        headers = dict(entry['headers'])
+        headers['content-length'] = '%d' % len(content)
+        return ReplayResponse(entry['status'], headers, content)
@@ -0,0 +1,350 @@
+"""
+Change notifications for NetX assets, so that one poller can serve many
+consumers.
+
+`AssetWatcher` polls NetX with date range searches, compares the results
+with fingerprints of the assets it has seen before and publishes `added`,
+`changed` and `deleted` events to in-process subscribers: callbacks, asyncio
+queues and clients of a local socket.
+
+Usage example:
+```
+    watcher = AssetWatcher(api, interval=60)
+    watcher.subscribe(lambda event: print(event.type, event.asset_id))
+    watcher.serve('/tmp/netx-events.sock')  # JSON Lines to each client
+    watcher.start()
+```
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import stat
+import threading
+import time
+from collections import namedtuple
+
+from .constants import QUERY_TYPE_RANGE, SEARCH_TYPE_DATE
+
+ADDED = 'added'
+CHANGED = 'changed'
+DELETED = 'deleted'
+
+DEFAULT_DATE_FORMAT = '%m/%d/%Y'
+EPOCH = datetime.datetime(1970, 1, 1)
+
+LOGGER = logging.getLogger(__name__)
+
+AssetEvent = namedtuple('AssetEvent', ['type', 'asset_id', 'asset'])
+
+
+def fingerprint(asset):
+    """
+    Returns a hash of the modification date and file size of an asset.
+    """
+    value = json.dumps([
+        asset.get('moddate', asset.get('creationdate')),
+        asset.get('filesize'),
+    ])
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def _unlink_socket(path):
+    """
+    Removes the Unix domain socket at `path` if there is one.
+    """
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except OSError:
+        pass
+
+
+class FingerprintStore(object):
+    """
+    Fingerprints of the assets seen by a watcher, kept in sqlite so that
+    they survive restarts when `path` is a file. Safe to share between
+    threads.
+    """
+    def __init__(self, path=':memory:'):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    asset_id INTEGER PRIMARY KEY,
+                    fingerprint TEXT
+                )
+                """)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, asset_id):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT fingerprint FROM fingerprints WHERE asset_id = ?',
+                (asset_id,)).fetchone()
+        return row and row[0]
+
+    def set(self, asset_id, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?)',
+                (asset_id, value))
+
+    def delete(self, asset_id):
+        with self.lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM fingerprints WHERE asset_id = ?', (asset_id,))
+
+    def update(self, fingerprints, deleted=()):
+        """
+        Sets the fingerprints of a dict by asset id and deletes those of the
+        `deleted` asset ids, in one transaction.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?)',
+                list(fingerprints.items()))
+            self.connection.executemany(
+                'DELETE FROM fingerprints WHERE asset_id = ?',
+                [(asset_id,) for asset_id in deleted])
+
+    def asset_ids(self):
+        with self.lock:
+            return set(row[0] for row in self.connection.execute(
+                'SELECT asset_id FROM fingerprints'))
+
+
+class AssetWatcher(object):
+    """
+    Polls NetX every `interval` seconds for assets modified since the last
+    poll, less an `overlap` for the day granularity of date searches, and
+    publishes events for assets which were added or changed.
+
+    Every `sweep_every` polls, starting with the first one, all assets are
+    listed instead, which also finds deleted assets: those which were not
+    listed and which NetX no longer returns when asked for them by id. Events for the assets
+    found by the first sweep into an empty store are only published if
+    `announce_existing` is True.
+    """
+    def __init__(self, api, interval=60, store=None, sweep_every=60,
+                 overlap=datetime.timedelta(days=1), date_type=0,
+                 date_format=DEFAULT_DATE_FORMAT, announce_existing=False):
+        self.api = api
+        self.interval = interval
+        self.store = store if store is not None else FingerprintStore()
+        self.sweep_every = sweep_every
+        self.overlap = overlap
+        self.date_type = date_type  # Sub-type 2 of the date search
+        self.date_format = date_format
+        self.announce_existing = announce_existing
+        self.polls = 0
+        self.last_poll = None
+        self.callbacks = []
+        self.queues = []  # (event loop, asyncio queue)
+        self.clients = []  # Sockets of local clients
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.server = None
+        self.address = None
+
+    def subscribe(self, callback):
+        """
+        Calls `callback(event)` for each event, in the thread of the watcher.
+        """
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.callbacks.remove(callback)
+
+    def queue(self, loop=None):
+        """
+        Returns an asyncio queue receiving the events. Call from the thread
+        running the event loop `loop` (default: the current event loop).
+        The queue stops receiving events once the event loop is closed.
+        """
+        import asyncio
+        loop = loop or asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        with self.lock:
+            self.queues.append((loop, queue))
+        return queue
+
+    def serve(self, address):
+        """
+        Publishes events as JSON Lines to the clients connecting to the local
+        socket at `address`, a path for a Unix domain socket or a
+        `(host, port)` tuple for a TCP socket.
+        """
+        family = socket.AF_INET if isinstance(address, tuple) else \
+            socket.AF_UNIX
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        else:
+            _unlink_socket(address)  # Left behind by a previous run
+        self.address = address
+        self.server.bind(address)
+        self.server.listen(5)
+        thread = threading.Thread(target=self._accept, args=(self.server,))
+        thread.daemon = True
+        thread.start()
+
+    def _accept(self, server):
+        while not self.stopped.is_set():
+            try:
+                client, _ = server.accept()
+            except (OSError, socket.error):
+                return  # Server closed
+            with self.lock:
+                self.clients.append(client)
+
+    def publish(self, event):
+        """
+        Publishes the event to all subscribers.
+        """
+        with self.lock:
+            callbacks = list(self.callbacks)
+            queues = list(self.queues)
+            clients = list(self.clients)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                LOGGER.exception('subscriber failed on %s', event)
+        for loop, queue in queues:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:  # Event loop closed
+                with self.lock:
+                    self.queues.remove((loop, queue))
+        if clients:
+            line = json.dumps({
+                'type': event.type,
+                'assetId': event.asset_id,
+                'asset': event.asset,
+            }) + '\n'
+            for client in clients:
+                try:
+                    client.sendall(line.encode('utf-8'))
+                except (OSError, socket.error):
+                    with self.lock:
+                        self.clients.remove(client)
+                    client.close()
+
+    def _filters(self, start):
+        """
+        Returns search filters for assets modified from `start` until
+        tomorrow.
+        """
+        end = datetime.datetime.now() + datetime.timedelta(days=1)
+        return [
+            [SEARCH_TYPE_DATE],                     # types
+            [QUERY_TYPE_RANGE],                     # sub-types 1
+            [self.date_type],                       # sub-types 2
+            [start.strftime(self.date_format)],     # values 1 (from date)
+            [end.strftime(self.date_format)],       # values 2 (to date)
+            [''],                                   # values 3
+        ]
+
+    def poll(self):
+        """
+        Polls NetX once and publishes the events. Returns the events.
+
+        Fingerprints are stored once all pages are listed and the events are
+        published, so that no change is lost if listing fails part way: the
+        next poll finds the changes again.
+        """
+        now = datetime.datetime.now()
+        sweep = self.last_poll is None or self.polls % self.sweep_every == 0
+        start = EPOCH if sweep else self.last_poll - self.overlap
+        announce = (self.announce_existing or self.last_poll is not None or
+                    bool(self.store.asset_ids()))
+
+        events = []
+        fingerprints = {}
+        seen = set()
+        for page in self.api.pages(
+                self.api.search, '', filters=self._filters(start)):
+            for asset in page:
+                asset_id = asset['assetId']
+                if asset_id in seen:  # Moved to a later page
+                    continue
+                seen.add(asset_id)
+                value = fingerprint(asset)
+                previous = self.store.get(asset_id)
+                if previous == value:
+                    continue
+                fingerprints[asset_id] = value
+                events.append(AssetEvent(
+                    ADDED if previous is None else CHANGED, asset_id, asset))
+        deleted = []
+        missing = self.store.asset_ids() - seen if sweep else None
+        if missing:
+            # Assets move to earlier pages when others are deleted during a
+            # sweep, so the missing ones are only deleted if NetX no longer
+            # knows of them.
+            existing = self.api.repurpose_availability(sorted(missing))
+            deleted = sorted(missing - set(existing))
+            events.extend(
+                AssetEvent(DELETED, asset_id, None) for asset_id in deleted)
+
+        if announce:
+            for event in events:
+                self.publish(event)
+        self.store.update(fingerprints, deleted)
+        if deleted and self.api.index is not None:
+            self.api.index.remove_assets(deleted)
+        self.polls += 1
+        self.last_poll = now
+        return events
+
+    def run(self):
+        """
+        Polls NetX every `interval` seconds until `stop` is called.
+        """
+        while not self.stopped.is_set():
+            start = time.time()
+            try:
+                self.poll()
+            except Exception:
+                LOGGER.exception('poll failed')
+            self.stopped.wait(max(0, self.interval - (time.time() - start)))
+
+    def start(self):
+        """
+        Runs the watcher in a background thread.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the watcher and closes the socket of `serve`.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            if not isinstance(self.address, tuple):
+                _unlink_socket(self.address)
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
@@ -28,8 +28,14 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     include_package_data=True,
     install_requires=[
+        'futures; python_version < "3"',
         'requests',
     ],
+    entry_points={
+        'console_scripts': [
+            'netx = netx.cli:main',
+        ],
+    },
     setup_requires=['setuptools_scm'],
     keywords=[
         'netx',
@@ -44,5 +50,6 @@ setuptools.setup(
         'Operating System :: POSIX :: Linux',
         'Programming Language :: Python',
         'Programming Language :: Python :: 2.7',
+        'Programming Language :: Python :: 3',
     ],
 )
@@ -0,0 +1,83 @@
+"""
+Test doubles for the HTTP transport of `NetX`, given with the `TRANSPORT`
+setting.
+"""
+
+import json
+import threading
+
+from requests.structures import CaseInsensitiveDict
+
+SETTINGS = {
+    'URL': 'https://netx.example.com',
+    'USERNAME': 'username',
+    'PASSWORD': 'password',
+    'REQUESTS_PER_SECOND': 1000,
+}
+
+
+class FakeResponse(object):
+    """
+    Response with the parts of `requests.Response` used by NetX. The
+    Content-Length header is left out if `content_length` is False, as for
+    chunked responses.
+    """
+    def __init__(self, content, status_code=200, headers=None,
+                 content_length=True):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        if content_length:
+            self.headers['content-length'] = '%d' % len(content)
+        self.content = content
+        self.closed = False
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeTransport(object):
+    """
+    Answers JSON-RPC calls with `rpc` and file downloads with `get` like a
+    NetX server, counting the calls of each JSON-RPC method and the requests
+    for each URL. Override `rpc` and `get` to serve other results.
+    """
+    def __init__(self):
+        self.calls = {}  # By JSON-RPC method
+        self.requests = {}  # By URL
+        self.lock = threading.Lock()
+
+    def rpc(self, method, params):
+        """
+        Returns the result of the JSON-RPC call.
+        """
+        return {
+            'authenticate': 'SESSION-KEY',
+            'getSelf': {'userId': 1},
+        }[method]
+
+    def get(self, url, params):
+        """
+        Returns the response to a GET request.
+        """
+        return FakeResponse(b'0123456789')
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        with self.lock:
+            self.requests[url] = self.requests.get(url, 0) + 1
+        if method == 'GET':
+            return self.get(url, params)
+        data = json.loads(data)
+        with self.lock:
+            self.calls[data['method']] = self.calls.get(data['method'], 0) + 1
+        result = self.rpc(data['method'], data['params'])
+        content = json.dumps({'id': data['id'], 'result': result})
+        return FakeResponse(
+            content.encode('utf-8'),
+            headers={'content-type': 'application/json'})
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from netx import NetX, cli
+from netx.cli import (
+    CHECKPOINT_FILENAME, METADATA_FILENAME, Exporter, _open_jsonl,
+    _read_jsonl, _write_jsonl, get_parser)
+from .fakes import SETTINGS, FakeResponse, FakeTransport
+
+CONTENT = b'\xff\xd8' + b'0123456789' * 10000
+
+
+class ChunkedTransport(FakeTransport):
+    """
+    Serves JPEG files without a Content-Length header.
+    """
+    def get(self, url, params):
+        return FakeResponse(
+            CONTENT, headers={'content-type': 'image/jpeg'},
+            content_length=False)
+
+
+class CLITests(unittest.TestCase):
+    """
+    Test argument parsing and resuming of exports without a NetX server.
+    """
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_parser(self):
+        parser = get_parser()
+        args = parser.parse_args([
+            '-s', 'http://example.com', 'export', '--cart', '5',
+            '--renditions', 'thumb,original', '-o', self.output])
+        self.assertEqual(args.command, 'export')
+        self.assertEqual(args.cart, 5)
+        self.assertEqual(args.renditions, 'thumb,original')
+        with self.assertRaises(SystemExit):
+            parser.parse_args(['export', '-o', self.output])
+
+    def test_jsonl_partial_line(self):
+        path = os.path.join(self.output, CHECKPOINT_FILENAME)
+        with open(path, 'w') as f:
+            f.write('{"asset_id": 1}\n{"asset_id": 2')
+        self.assertEqual(list(_read_jsonl(path)), [{'asset_id': 1}])
+        f = _open_jsonl(path)
+        _write_jsonl(f, {'asset_id': 3})
+        f.close()
+        self.assertEqual(
+            list(_read_jsonl(path)), [{'asset_id': 1}, {'asset_id': 3}])
+
+    def test_resume(self):
+        with open(os.path.join(self.output, METADATA_FILENAME), 'w') as f:
+            f.write(json.dumps({'assetId': 1}) + '\n')
+        exporter = Exporter(
+            None, {}, self.output, renditions=['thumb', 'original'])
+        items = [(None, {'assetId': 1}), (None, {'assetId': 2})]
+        metadata = _open_jsonl(os.path.join(self.output, METADATA_FILENAME))
+        tasks = list(exporter._tasks(items, metadata, set([(1, 'thumb')])))
+        metadata.close()
+
+        self.assertEqual(
+            [(task['asset_id'], task['rendition']) for task in tasks],
+            [(1, 'original'), (2, 'thumb'), (2, 'original')])
+        self.assertEqual(exporter.stats['skipped'], 1)
+        self.assertEqual(
+            [record['assetId'] for record in _read_jsonl(
+                os.path.join(self.output, METADATA_FILENAME))], [1, 2])
+
+    def test_download(self):
+        cli._worker_api = NetX(dict(SETTINGS, TRANSPORT=ChunkedTransport()))
+        cli._worker_api._session_key = 'SESSION-KEY'
+        self.addCleanup(setattr, cli, '_worker_api', None)
+        result = cli._download({
+            'asset_id': 1,
+            'rendition': 'original',
+            'path': os.path.join(self.output, '1', 'original'),
+        })
+        self.assertNotIn('error', result)
+        self.assertEqual(result['size'], len(CONTENT))
+        self.assertEqual(
+            result['sha256'], hashlib.sha256(CONTENT).hexdigest())
+        with open(result['path'], 'rb') as f:
+            self.assertEqual(f.read(), CONTENT)
+        self.assertEqual(os.listdir(os.path.join(self.output, '1')),
+                         [os.path.basename(result['path'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
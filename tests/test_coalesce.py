@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+from netx.coalesce import AsyncSingleFlight, SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+    """
+    Test that identical concurrent calls share one call.
+    """
+    def test_do(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            release.wait()
+            return {'assetId': 1}
+
+        def call():
+            results.append(flight.do('getAssetBean', fetch))
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while len(calls) < 1 or flight.coalesced < 4:
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(results, [{'assetId': 1}] * 5)
+        # Callers get their own copies of the result.
+        self.assertEqual(len(set(id(result) for result in results)), 5)
+
+        # Calls which are not concurrent are not coalesced.
+        flight.do('getAssetBean', fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_do_error(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            flight.do('getAssetBean', fail)
+        self.assertEqual(flight.calls, {})
+
+
+class AsyncSingleFlightTests(unittest.TestCase):
+    """
+    Test that identical concurrent coroutine calls share one call.
+    """
+    def test_do(self):
+        import asyncio
+        flight = AsyncSingleFlight()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'assetId': 1}
+
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            futures = [flight.do('getAssetBean', fetch) for _ in range(5)]
+            results = loop.run_until_complete(asyncio.gather(*futures))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(results, [{'assetId': 1}] * 5)
+
+if __name__ == '__main__':
+    unittest.main()
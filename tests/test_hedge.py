@@ -0,0 +1,129 @@
+import threading
+import time
+import unittest
+from netx import NetX
+from netx.hedge import Hedger
+from .fakes import SETTINGS, FakeTransport
+
+
+class FakeResponse(object):
+    def __init__(self, attempt):
+        self.attempt = attempt
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class HedgerTests(unittest.TestCase):
+    """
+    Test that slow requests are hedged within the budget.
+    """
+    def setUp(self):
+        self.hedger = Hedger(budget=0.5, min_delay=0, min_samples=2)
+        self.attempts = []
+        self.lock = threading.Lock()
+
+    def send(self, delays):
+        """
+        Returns a send function whose attempts take the given delays.
+        """
+        def send():
+            with self.lock:
+                attempt = len(self.attempts)
+                self.attempts.append(attempt)
+            time.sleep(delays[attempt] if attempt < len(delays) else 0)
+            return FakeResponse(attempt)
+        return send
+
+    def test_hedge(self):
+        self.hedger.latencies[None].extend([0.01, 0.01])
+        self.hedger.tokens = 1
+        response = self.hedger.call(self.send([0.5, 0]))
+        self.assertEqual(response.attempt, 1)
+        self.assertEqual(self.hedger.hedged, 1)
+        self.assertEqual(self.hedger.hedge_wins, 1)
+
+    def test_no_samples(self):
+        response = self.hedger.call(self.send([0.1, 0]))
+        self.assertEqual(response.attempt, 0)
+        self.assertEqual(self.hedger.hedged, 0)
+
+    def test_budget(self):
+        self.hedger.latencies[None].extend([0.01, 0.01])
+        response = self.hedger.call(self.send([0.1, 0]))
+        self.assertEqual(response.attempt, 0)  # One call earns half a hedge.
+        self.assertEqual(self.hedger.hedged, 0)
+        response = self.hedger.call(self.send([0, 0.3, 0]))
+        self.assertEqual(response.attempt, 2)
+        self.assertEqual(self.hedger.hedged, 1)
+
+    def test_kinds(self):
+        self.hedger.latencies['getAssetBean'].extend([0.01, 0.01])
+        self.hedger.tokens = 1
+        response = self.hedger.call(self.send([0.1, 0]), kind='file/zoom')
+        self.assertEqual(response.attempt, 0)  # No latencies of this kind
+        self.assertEqual(self.hedger.hedged, 0)
+        self.assertEqual(len(self.hedger.latencies['file/zoom']), 1)
+
+    def test_concurrency(self):
+        hedger = Hedger(min_samples=2, max_workers=2)
+        hedger.latencies[None].extend([1, 1])
+        hedger.tokens = 1
+
+        def send():
+            time.sleep(0.2)
+            return FakeResponse(0)
+        threads = [
+            threading.Thread(target=hedger.call, args=(send,))
+            for _ in range(16)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Not limited to the 2 requests at a time of the thread pool.
+        self.assertLess(time.time() - start, 0.6)
+
+
+class CountingRateLimiter(object):
+    def __init__(self):
+        self.waits = 0
+
+    def wait(self):
+        self.waits += 1
+
+
+class SlowFirstTransport(FakeTransport):
+    """
+    Serves files, the first request after 0.5 seconds.
+    """
+    def get(self, url, params):
+        with self.lock:
+            attempt = sum(self.requests.values())
+        if attempt == 1:
+            time.sleep(0.5)
+        return super(SlowFirstTransport, self).get(url, params)
+
+
+class NetXHedgeTests(unittest.TestCase):
+    def test_hedge_rate_limited(self):
+        limiter = CountingRateLimiter()
+        api = NetX(dict(
+            SETTINGS,
+            HEDGE_REQUESTS=True,
+            RATE_LIMITER=limiter,
+            TRANSPORT=SlowFirstTransport(),
+        ))
+        api._session_key = 'SESSION-KEY'
+        api.hedger.latencies['GET /file/asset/*/thumb'].extend(
+            [0.01] * api.hedger.min_samples)
+        api.hedger.tokens = 1
+        headers, content = api.file(1, 'thumb')
+        self.assertEqual(content, b'0123456789')
+        self.assertEqual(api.hedger.hedged, 1)
+        self.assertEqual(limiter.waits, 2)  # The hedge counts too
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import unittest
+
+
+class ImportTests(unittest.TestCase):
+    """
+    Test that the HTTP stack is only imported once a request is sent. See
+    `benchmarks/import_time.py` for import timings.
+    """
+    def imports_requests(self, statement):
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            "import sys; %s; print('requests' in sys.modules)" % statement])
+        return output.strip() == b'True'
+
+    def test_import(self):
+        self.assertFalse(self.imports_requests(
+            'import netx, netx.constants, netx.exceptions, netx.index'))
+        self.assertFalse(self.imports_requests(
+            'from netx import SettingsError, ResponseError, NetX'))
+        self.assertFalse(self.imports_requests(
+            "from netx import NetX; NetX({'URL': 'http://example.com'})"))
+
+    def test_import_transport(self):
+        self.assertTrue(self.imports_requests(
+            'from netx import NetX; NetX({}).transport'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import unittest
+from netx import NetX
+from netx.index import AssetIndex, IndexMiss
+from netx.netx import (
+    CATEGORY_TYPE_ONLY, CATEGORY_TYPE_RECURSIVE, QUERY_TYPE_AND,
+    QUERY_TYPE_AND_FRAG, SEARCH_TYPE_CATEGORY, SEARCH_TYPE_DATE,
+    SEARCH_TYPE_KEYWORDS)
+from .fakes import SETTINGS, FakeTransport
+
+
+def asset(asset_id, name, **attributes):
+    return {
+        'assetId': asset_id,
+        'name': name,
+        'attributeNames': list(attributes.keys()),
+        'attributeValues': list(attributes.values()),
+        'creationdate': 1451979500852,
+        'filesize': 93336,
+    }
+
+
+def category_filter(query_type, path):
+    return [[SEARCH_TYPE_CATEGORY], [query_type], [0], [path], [''], ['']]
+
+
+def keyword_filter(keyword, path):
+    """
+    Returns filters for assets matching `keyword` in the category `path` and
+    its sub categories.
+    """
+    return [
+        [SEARCH_TYPE_KEYWORDS, SEARCH_TYPE_CATEGORY],
+        [QUERY_TYPE_AND_FRAG, CATEGORY_TYPE_RECURSIVE],
+        [0, 0],
+        [keyword, path],
+        ['', ''],
+        ['', ''],
+    ]
+
+
+class IndexTransport(FakeTransport):
+    """
+    Answers JSON-RPC calls like a NetX server holding `self.categories` and
+    the assets in `self.assets`.
+    """
+    def __init__(self):
+        super(IndexTransport, self).__init__()
+        self.categories = {  # id: (parent id, name)
+            10: (1, u'Artworks'),
+            14: (10, u'Artists M-Q'),
+            15148: (14, u'Maar, Dora'),
+            15149: (14, u'Ray, Man'),
+        }
+        self.assets = {  # id: (category path, asset bean)
+            1: ('Artworks/Artists M-Q/Maar, Dora',
+                asset(1, 'Double Portrait', Artist='Dora Maar')),
+            2: ('Artworks/Artists M-Q/Maar, Dora',
+                asset(2, 'Portrait of Nusch', Artist='Man Ray')),
+            3: ('Artworks/Artists M-Q/Ray, Man',
+                asset(3, 'Untitled', Artist='Man Ray')),
+        }
+
+    def _matches(self, search_type, query_type, value, path, bean):
+        if search_type == SEARCH_TYPE_CATEGORY:
+            if query_type == CATEGORY_TYPE_ONLY:
+                return path == value
+            return path == value or path.startswith(value + '/')
+        text = ' '.join([bean['name']] + bean['attributeValues']).lower()
+        return all(word in text for word in value.lower().split())
+
+    def _search(self, params):
+        filters = params[3:9]
+        start_index, assets_per_page = params[-2:]
+        beans = [
+            bean for path, bean in self.assets.values()
+            if all(self._matches(search_type, query_type, value, path, bean)
+                   for search_type, query_type, _, value, _, _
+                   in zip(*filters))]
+        beans.sort(key=lambda bean: bean['name'], reverse=True)
+        return beans[start_index - 1:start_index - 1 + assets_per_page]
+
+    def _categories(self, params):
+        return [{
+            'categoryid': category_id,
+            'parentid': parent_id,
+            'name': name,
+            'children': any(
+                parent == category_id
+                for parent, _ in self.categories.values()),
+        } for category_id, (parent_id, name) in sorted(
+            self.categories.items()) if parent_id == params[1]]
+
+    def rpc(self, method, params):
+        if method == 'searchAssetBeanObjects':
+            return self._search(params)
+        if method == 'getCategories':
+            return self._categories(params)
+        if method == 'getAssetBean':
+            return dict(self.assets[params[0]][1])
+        return super(IndexTransport, self).rpc(method, params)
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = AssetIndex()
+        self.transport = IndexTransport()
+        self.settings = dict(
+            SETTINGS,
+            ASSETS_PER_PAGE=2,
+            TRANSPORT=self.transport,
+            LOCAL_INDEX=self.index,
+        )
+        self.api = NetX(self.settings)
+        self.category_path = [
+            {'id': 1, 'name': u'netx'},
+            {'id': 10, 'name': u'Artworks'},
+            {'id': 14, 'name': u'Artists M-Q'},
+        ]
+
+    def tearDown(self):
+        self.index.close()
+
+
+class AssetIndexTests(IndexTestCase):
+    """
+    Test local queries against an in-memory asset index.
+    """
+    def setUp(self):
+        super(AssetIndexTests, self).setUp()
+        self.assertEqual(self.index.sync(self.api, self.category_path), 3)
+
+    def test_search(self):
+        assets = self.index.search(
+            '', filters=keyword_filter('portrait', 'Artworks/Artists M-Q'))
+        self.assertEqual([a['assetId'] for a in assets], [2, 1])
+
+        # Keywords match metadata and fragments of words.
+        assets = self.index.search(
+            '', filters=keyword_filter('ra', 'Artworks/Artists M-Q'))
+        self.assertEqual([a['assetId'] for a in assets], [3, 2])
+
+    def test_search_pagination(self):
+        filters = keyword_filter('portrait', 'Artworks/Artists M-Q')
+        assets = self.index.search(
+            '', page_num=2, filters=filters, assets_per_page=1)
+        self.assertEqual([a['assetId'] for a in assets], [1])
+        self.assertEqual(self.index.search(
+            '', page_num=3, filters=filters, assets_per_page=1), [])
+
+    def test_search_unsupported_filters(self):
+        filters = [[SEARCH_TYPE_DATE], [QUERY_TYPE_AND], [0], [''], [''], ['']]
+        with self.assertRaises(IndexMiss):
+            self.index.search('portrait', filters=filters)
+
+    def test_search_not_synced(self):
+        # Indexed assets may be a fraction of those matching the keywords.
+        with self.assertRaises(IndexMiss):
+            self.index.search('portrait')
+        with self.assertRaises(IndexMiss):
+            self.index.search(
+                '', filters=keyword_filter('portrait', 'Photographs'))
+        # The parent category was not synced recursively.
+        with self.assertRaises(IndexMiss):
+            self.index.search('', filters=category_filter(
+                CATEGORY_TYPE_RECURSIVE, 'Artworks'))
+
+    def test_category_assets(self):
+        assets = self.index.category_assets(
+            self.category_path + [{'id': 15148, 'name': u'Maar, Dora'}])
+        self.assertEqual([a['assetId'] for a in assets], [2, 1])
+        self.assertEqual(self.index.category_assets(self.category_path), [])
+
+        assets = self.index.category_assets(
+            self.category_path, filters=category_filter(
+                CATEGORY_TYPE_RECURSIVE, 'Artworks/Artists M-Q'))
+        self.assertEqual([a['assetId'] for a in assets], [3, 2, 1])
+
+    def test_resync(self):
+        # Asset 2 moved to another category.
+        bean = self.transport.assets[2][1]
+        self.transport.assets[2] = ('Artworks/Artists M-Q/Ray, Man', bean)
+        self.index.sync(self.api, self.category_path)
+        assets = self.index.category_assets(
+            self.category_path + [{'id': 15148, 'name': u'Maar, Dora'}])
+        self.assertEqual([a['assetId'] for a in assets], [1])
+
+    def test_get_asset_info(self):
+        with self.assertRaises(IndexMiss):
+            self.index.get_asset_info(1)
+        info = asset(1, 'Double Portrait')
+        info['attributes'] = {'Artist': 'Dora Maar'}
+        self.index.add_asset_info(info)
+        self.assertEqual(self.index.get_asset_info(1), info)
+
+    def test_modified_asset_info(self):
+        info = asset(1, 'Double Portrait')
+        info['attributes'] = {'Title': 'old'}
+        info['moddate'] = 1
+        self.index.add_asset_info(info)
+        self.index.add_assets([info])
+        self.assertEqual(self.index.get_asset_info(1), info)
+
+        # Newer beans make the recorded asset info stale.
+        self.index.add_assets([dict(info, moddate=2)])
+        with self.assertRaises(IndexMiss):
+            self.index.get_asset_info(1)
+
+    def test_remove_assets(self):
+        self.index.remove_assets([1, 2])
+        filters = keyword_filter('portrait', 'Artworks/Artists M-Q')
+        self.assertEqual(self.index.search('', filters=filters), [])
+
+
+class NetXIndexTests(IndexTestCase):
+    """
+    Test that the client populates the index and falls back to the live API.
+    """
+    def test_category_assets(self):
+        path = self.category_path + [{'id': 15148, 'name': u'Maar, Dora'}]
+        self.assertEqual(
+            [a['assetId'] for a in self.api.category_assets(path)], [2, 1])
+        rows = self.index.connection.execute(
+            'SELECT category_path, asset_id FROM asset_categories '
+            'ORDER BY asset_id').fetchall()
+        self.assertEqual(rows, [
+            ('Artworks/Artists M-Q/Maar, Dora', 1),
+            ('Artworks/Artists M-Q/Maar, Dora', 2),
+        ])
+
+    def test_search_falls_back(self):
+        api = NetX(dict(self.settings, LOCAL_INDEX_READS=True))
+        api.get_asset_info(1)
+        # Partly indexed results are not served from the index.
+        self.assertEqual(
+            [a['assetId'] for a in api.search('portrait')], [2, 1])
+        self.assertEqual(self.transport.calls['searchAssetBeanObjects'], 1)
+
+        self.index.sync(api, self.category_path)
+        calls = self.transport.calls['searchAssetBeanObjects']
+        filters = keyword_filter('man ray', 'Artworks/Artists M-Q')
+        assets = [
+            a['assetId'] for page in api.pages(api.search, '', filters=filters)
+            for a in page]
+        self.assertEqual(assets, [3, 2])
+        self.assertEqual(
+            self.transport.calls['searchAssetBeanObjects'], calls)
+
+    def test_root_sync(self):
+        api = NetX(dict(self.settings, LOCAL_INDEX_READS=True))
+        self.index.sync(api, self.category_path[:1])
+        calls = self.transport.calls['searchAssetBeanObjects']
+
+        assets = self.index.search('', filters=category_filter(
+            CATEGORY_TYPE_RECURSIVE, ''))
+        self.assertEqual([a['assetId'] for a in assets], [3, 2, 1])
+        # Keyword searches in all categories are served locally.
+        self.assertEqual(
+            [a['assetId'] for a in api.search('portrait')], [2, 1])
+        self.assertEqual(
+            self.transport.calls['searchAssetBeanObjects'], calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
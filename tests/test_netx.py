@@ -125,6 +125,21 @@ class NetXTests(unittest.TestCase):
         path = result.get('path')
         self.assertTrue(len(path) > 0)
 
+    def test_prepare_jpegs(self):
+        assets = self.api.category_assets(self.category_path)[:3]
+        asset_ids = [asset.get('assetId') for asset in assets]
+
+        result = self.api.prepare_assets_with_preset(asset_ids, chunk_size=2)
+        self.assertEqual(set(result['assets'].keys()), set(asset_ids))
+        for outcome in result['assets'].values():
+            self.assertIn(outcome['status'], ('prepared', 'skipped'))
+            if outcome['status'] == 'prepared':
+                job = result['jobs'][outcome['job']]
+                self.assertEqual(job['progress'].get('percentComplete'), 100)
+                self.assertTrue(len(job['prepared_asset'].get('path')) > 0)
+            else:
+                self.assertTrue(outcome['reason'])
+
 
 if __name__ == '__main__':
     unittest.main()
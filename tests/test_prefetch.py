@@ -0,0 +1,170 @@
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from netx import NetX
+from netx.prefetch import Prefetcher, RenditionCache
+from .fakes import SETTINGS, FakeTransport
+
+
+class FakeNetX(object):
+    """
+    Serves pages of 2 assets and renditions of 10 bytes, recording calls.
+    """
+    assets_per_page = 2
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def background(self):
+        yield
+
+    def search(self, keyword, page_num=1):
+        with self.lock:
+            self.calls.append(('search', page_num))
+        start = (page_num - 1) * self.assets_per_page + 1
+        return [{'assetId': i} for i in range(start, start + 2)]
+
+    def file(self, asset_id, data='zoom', stream=False):
+        with self.lock:
+            self.calls.append(('file', asset_id, data))
+        return ({}, b'0123456789')
+
+
+class RenditionCacheTests(unittest.TestCase):
+    def test_eviction(self):
+        cache = RenditionCache(max_bytes=25)
+        cache.set(1, ({}, b'0' * 10))
+        cache.set(2, ({}, b'0' * 10))
+        cache.get(1)
+        cache.set(3, ({}, b'0' * 10))
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertEqual(cache.bytes, 20)
+
+
+class PrefetcherTests(unittest.TestCase):
+    """
+    Test prefetching of pages and renditions.
+    """
+    def setUp(self):
+        self.api = FakeNetX()
+
+    def wait(self, prefetcher):
+        prefetcher.tasks.put(None)
+        prefetcher.thread.join()
+
+    def test_page(self):
+        prefetcher = Prefetcher(self.api)
+        assets = prefetcher.page(self.api.search, 1, 'keyword')
+        self.assertEqual([asset['assetId'] for asset in assets], [1, 2])
+        self.wait(prefetcher)
+        self.assertEqual(self.api.calls, [
+            ('search', 1),
+            ('file', 1, 'thumb'),
+            ('file', 2, 'thumb'),
+            ('search', 2),
+            ('file', 1, 'preview'),
+            ('file', 2, 'preview'),
+        ])
+
+        # Prefetched page and renditions are served without requests.
+        del self.api.calls[:]
+        assets = prefetcher.page(self.api.search, 2, 'keyword')
+        self.assertEqual([asset['assetId'] for asset in assets], [3, 4])
+        prefetcher.file(1, 'thumb')
+        self.assertEqual(self.api.calls, [])
+
+    def test_budget(self):
+        prefetcher = Prefetcher(self.api, page_requests=2)
+        prefetcher.page(self.api.search, 1, 'keyword')
+        self.wait(prefetcher)
+        self.assertEqual(self.api.calls, [
+            ('search', 1),
+            ('file', 1, 'thumb'),
+            ('file', 2, 'thumb'),
+        ])
+
+        del self.api.calls[:]
+        prefetcher = Prefetcher(self.api, page_bytes=5)
+        prefetcher.page(self.api.search, 1, 'keyword')
+        self.wait(prefetcher)
+        self.assertEqual(self.api.calls, [
+            ('search', 1),
+            ('file', 1, 'thumb'),
+        ])
+
+
+class BlockingTransport(FakeTransport):
+    """
+    Serves files, blocking requests for the 'zoom' rendition until `release`
+    is set.
+    """
+    def __init__(self):
+        super(BlockingTransport, self).__init__()
+        self.release = threading.Event()
+
+    def get(self, url, params):
+        if url.endswith('/zoom'):
+            self.release.wait()
+        return super(BlockingTransport, self).get(url, params)
+
+
+class PriorityTests(unittest.TestCase):
+    """
+    Test that background requests give way to foreground requests.
+    """
+    def setUp(self):
+        self.transport = BlockingTransport()
+        self.api = NetX(dict(SETTINGS, TRANSPORT=self.transport))
+        self.api._session_key = 'SESSION-KEY'
+        self.threads = []
+        self.addCleanup(self.join)
+
+    def join(self):
+        self.transport.release.set()
+        for thread in self.threads:
+            thread.join()
+
+    def start(self, target):
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+        return thread
+
+    def wait_for(self, condition):
+        deadline = time.time() + 1
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_foreground_promotes_background_call(self):
+        # A slow foreground request holds back background requests.
+        self.start(lambda: self.api.file(1, 'zoom'))
+        self.wait_for(lambda: self.api._foreground_requests)
+
+        def prefetch():
+            with self.api.background():
+                self.api.file(2, 'thumb')
+        self.start(prefetch)
+        self.wait_for(lambda: len(self.api.single_flight.calls) == 2)
+        time.sleep(0.05)
+        url = self.api.file_url(2, 'thumb')
+        self.assertNotIn(url, self.transport.requests)
+
+        # The user asks for the rendition being prefetched and joins the
+        # background call, which is then sent without waiting.
+        thread = self.start(lambda: self.api.file(2, 'thumb'))
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(self.transport.release.is_set())
+        self.assertEqual(self.transport.requests[url], 1)
+        self.assertEqual(self.api.coalesced_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
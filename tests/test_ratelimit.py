@@ -0,0 +1,96 @@
+import time
+import unittest
+from netx import NetX
+from netx.ratelimit import AdaptiveRateController
+from .fakes import SETTINGS, FakeTransport
+
+
+class AdaptiveRateControllerTests(unittest.TestCase):
+    """
+    Test that the rate follows the latency and errors of responses.
+    """
+    def setUp(self):
+        self.controller = AdaptiveRateController(
+            requests_per_second=2, min_requests_per_second=1,
+            max_requests_per_second=4, increase=1, decrease=0.5, window=10,
+            cooldown=0)
+
+    def record_window(self, latency):
+        for _ in range(self.controller.window):
+            self.controller.record(latency)
+
+    def test_increase(self):
+        self.record_window(0.1)
+        self.assertEqual(self.controller.requests_per_second, 3)
+        self.record_window(0.1)
+        self.record_window(0.1)
+        self.assertEqual(self.controller.requests_per_second, 4)  # Ceiling
+
+    def test_decrease_on_error(self):
+        self.controller.record(1, error=True)
+        self.assertEqual(self.controller.requests_per_second, 1)
+        self.controller.record(1, error=True)
+        self.assertEqual(self.controller.requests_per_second, 1)  # Floor
+
+    def test_decrease_on_rising_latency(self):
+        self.record_window(0.1)
+        self.assertEqual(self.controller.requests_per_second, 3)
+        self.record_window(1)
+        self.assertEqual(self.controller.requests_per_second, 1.5)
+        self.assertEqual(self.controller.latency_p95, 1)
+
+    def test_latency_target(self):
+        self.controller.latency_target = 0.5
+        self.record_window(1)
+        self.assertEqual(self.controller.requests_per_second, 1)
+
+    def test_cooldown(self):
+        self.controller.cooldown = 60
+        self.controller.record(1, error=True)
+        self.controller.record(1, error=True)
+        self.assertEqual(self.controller.requests_per_second, 1)
+        self.controller.requests_per_second = 4
+        self.controller.record(1, error=True)
+        self.assertEqual(self.controller.requests_per_second, 4)
+
+
+class RecordingRateLimiter(object):
+    def __init__(self):
+        self.latencies = []
+
+    def wait(self):
+        pass
+
+    def record(self, latency, error=False):
+        self.latencies.append(latency)
+
+
+class SlowDownloadTransport(FakeTransport):
+    """
+    Serves files whose content takes 0.2 seconds to download, which
+    `requests` does before returning unless the request streams.
+    """
+    def request(self, method, url, params=None, data=None, **kwargs):
+        if method == 'GET' and not kwargs.get('stream'):
+            time.sleep(0.2)
+        return super(SlowDownloadTransport, self).request(
+            method, url, params=params, data=data, **kwargs)
+
+
+class NetXRateLimitTests(unittest.TestCase):
+    def test_latency_to_headers(self):
+        limiter = RecordingRateLimiter()
+        api = NetX(dict(
+            SETTINGS,
+            RATE_LIMITER=limiter,
+            TRANSPORT=SlowDownloadTransport(),
+        ))
+        api._session_key = 'SESSION-KEY'
+        headers, content = api.file(1, 'thumb')
+        self.assertEqual(content, b'0123456789')
+        self.assertEqual(len(limiter.latencies), 1)
+        self.assertLess(limiter.latencies[0], 0.1)  # Not the download
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from netx import NetX
+from netx.replay import RecordingTransport, ReplayMiss, ReplayTransport
+from .fakes import SETTINGS, FakeResponse, FakeTransport
+
+
+class AssetTransport(FakeTransport):
+    """
+    Answers getAssetBean calls and serves JPEG files.
+    """
+    def rpc(self, method, params):
+        if method == 'getAssetBean':
+            return {
+                'assetId': params[0],
+                'attributeNames': ['Artist'],
+                'attributeValues': ['Dora Maar'],
+            }
+        return super(AssetTransport, self).rpc(method, params)
+
+    def get(self, url, params):
+        return FakeResponse(
+            b'\xff\xd8jpeg', headers={'content-type': 'image/jpeg'})
+
+
+class ReplayTests(unittest.TestCase):
+    """
+    Test recording traffic and replaying it through the client.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'traffic.jsonl.gz')
+        self.settings = dict(SETTINGS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self):
+        recorder = RecordingTransport(self.path, transport=AssetTransport())
+        api = NetX(dict(self.settings, TRANSPORT=recorder))
+        info = api.get_asset_info(1)
+        headers, content = api.file(1, 'thumb')
+        recorder.close()
+        return info, content
+
+    def test_redaction(self):
+        self.record()
+        with gzip.open(self.path, 'rb') as archive:
+            recorded = archive.read()
+        self.assertNotIn(b'password', recorded)
+        self.assertNotIn(b'SESSION-KEY', recorded)
+        self.assertIn(b'Dora Maar', recorded)
+
+    def test_replay(self):
+        info, content = self.record()
+        replay = ReplayTransport(self.path, speed=None)
+        api = NetX(dict(
+            self.settings, URL='http://localhost:8000', TRANSPORT=replay))
+        self.assertEqual(api.get_asset_info(1), info)
+        self.assertEqual(api.get_asset_info(1), info)
+        self.assertEqual(api.file(1, 'thumb')[1], content)
+        with self.assertRaises(ReplayMiss):
+            api.get_asset_info(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from netx import NetX
+from .fakes import SETTINGS, FakeTransport
+
+
+class RepurposeTransport(FakeTransport):
+    """
+    Answers the JSON-RPC calls of batch repurposing like a NetX server. The
+    server leaves out asset 5 and lists the others in reverse order, refuses
+    jobs for asset 7 and never completes jobs for asset 6. The first progress
+    report of a job is null.
+    """
+    available = {1: True, 2: True, 3: True, 4: False, 6: True, 7: True}
+
+    def __init__(self):
+        super(RepurposeTransport, self).__init__()
+        self.jobs = []
+        self.progress_reports = 0
+
+    def rpc(self, method, params):
+        if method == 'getAssetObjects':
+            return [
+                {'assetId': asset_id,
+                 'repurposeAvailability': self.available[asset_id]}
+                for asset_id in reversed(params[0])
+                if asset_id in self.available]
+        if method == 'repurposeAssetsWithPresetProcess':
+            if 7 in params[0]:
+                return False
+            self.jobs.append(params[0])
+            self.progress_reports = 0
+            return True
+        if method == 'getProgressReport':
+            self.progress_reports += 1
+            if self.progress_reports == 1:
+                return None
+            return {'percentComplete': 50 if 6 in self.jobs[-1] else 100}
+        if method == 'getShareBean':
+            return {'path': '/session/%s.zip' % len(self.jobs)}
+        return super(RepurposeTransport, self).rpc(method, params)
+
+
+class PrepareAssetsTests(unittest.TestCase):
+    """
+    Test batch repurposing against a fake server.
+    """
+    def setUp(self):
+        self.transport = RepurposeTransport()
+        self.api = NetX(dict(SETTINGS, TRANSPORT=self.transport))
+
+    def test_repurpose_availability(self):
+        self.assertEqual(
+            self.api.repurpose_availability([1, 4, 5]), {1: True, 4: False})
+
+    def test_prepare_assets(self):
+        result = self.api.prepare_assets_with_preset(
+            [1, 2, 3, 4, 5, 6, 7], chunk_size=2, poll_interval=0.01,
+            timeout=0.1)
+        self.assertEqual(self.transport.jobs, [[1, 2], [3, 6]])
+        statuses = dict(
+            (asset_id, (outcome['status'], outcome['job']))
+            for asset_id, outcome in result['assets'].items())
+        self.assertEqual(statuses, {
+            1: ('prepared', 0),
+            2: ('prepared', 0),
+            3: ('failed', None),  # Did not complete
+            4: ('skipped', None),  # Not available
+            5: ('skipped', None),  # Left out by the server
+            6: ('failed', None),
+            7: ('failed', None),  # Refused
+        })
+        self.assertEqual(len(result['jobs']), 1)
+        self.assertEqual(result['jobs'][0]['asset_ids'], [1, 2])
+        self.assertEqual(
+            result['jobs'][0]['prepared_asset'], {'path': '/session/1.zip'})
+        self.assertIn('0.1 seconds', result['assets'][3]['reason'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from netx.constants import QUERY_TYPE_RANGE, SEARCH_TYPE_DATE
+from netx.watch import (
+    ADDED, CHANGED, DELETED, AssetWatcher, FingerprintStore)
+
+
+class FakeNetX(object):
+    """
+    Serves the assets in `self.assets` to date range searches, recording the
+    filters, and by id to `repurpose_availability`.
+    """
+    assets_per_page = 2
+    index = None
+
+    def __init__(self):
+        self.assets = {}
+        self.filters = []
+        self.failing_page = None
+
+    def pages(self, fetch, *args, **kwargs):
+        page_num = 1
+        while True:
+            page = fetch(*args, page_num=page_num, **kwargs)
+            if page:
+                yield page
+            if len(page) < self.assets_per_page:
+                return
+            page_num += 1
+
+    def search(self, keyword, page_num=1, filters=None):
+        self.filters.append(filters)
+        if page_num == self.failing_page:
+            raise IOError('timed out')
+        assets = [self.assets[k] for k in sorted(self.assets)]
+        start = (page_num - 1) * self.assets_per_page
+        return assets[start:start + self.assets_per_page]
+
+    def repurpose_availability(self, asset_ids):
+        return dict(
+            (asset_id, True) for asset_id in asset_ids
+            if asset_id in self.assets)
+
+    def put(self, asset_id, moddate, filesize=100):
+        self.assets[asset_id] = {
+            'assetId': asset_id,
+            'moddate': moddate,
+            'filesize': filesize,
+        }
+
+
+class AssetWatcherTests(unittest.TestCase):
+    """
+    Test polling and publishing of asset changes.
+    """
+    def setUp(self):
+        self.api = FakeNetX()
+        for asset_id in range(1, 4):
+            self.api.put(asset_id, 1000)
+        self.events = []
+        self.watcher = AssetWatcher(self.api, sweep_every=2)
+        self.watcher.subscribe(self.events.append)
+
+    def test_first_sweep_is_silent(self):
+        self.assertEqual(len(self.watcher.poll()), 3)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.watcher.store.asset_ids(), set([1, 2, 3]))
+
+    def test_announce_existing(self):
+        self.watcher.announce_existing = True
+        self.watcher.poll()
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events],
+            [(ADDED, 1), (ADDED, 2), (ADDED, 3)])
+
+    def test_changes(self):
+        self.watcher.poll()
+        self.api.put(2, 2000)
+        self.api.put(4, 2000)
+        self.watcher.poll()
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events],
+            [(CHANGED, 2), (ADDED, 4)])
+        filters = self.api.filters[-1]
+        self.assertEqual(filters[0], [SEARCH_TYPE_DATE])
+        self.assertEqual(filters[1], [QUERY_TYPE_RANGE])
+        self.assertNotEqual(filters[3], ['01/01/1970'])  # Incremental
+
+        del self.api.assets[3]
+        self.watcher.poll()  # Sweep
+        self.assertEqual(self.api.filters[-1][3], ['01/01/1970'])
+        self.assertEqual(self.events[-1].type, DELETED)
+        self.assertEqual(self.events[-1].asset_id, 3)
+        self.assertEqual(self.watcher.store.asset_ids(), set([1, 2, 4]))
+
+    def test_deleted_during_sweep(self):
+        self.watcher.poll()
+        self.watcher.poll()
+        search = self.api.search
+
+        def search_deleting(keyword, page_num=1, filters=None):
+            page = search(keyword, page_num=page_num, filters=filters)
+            if page_num == 1:
+                del self.api.assets[1]  # Moves asset 3 to the first page
+            return page
+        self.api.search = search_deleting
+        self.watcher.poll()  # Sweep, which does not list asset 3
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.watcher.store.asset_ids(), set([1, 2, 3]))
+
+        self.api.search = search
+        self.watcher.poll()
+        self.watcher.poll()  # Sweep
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events], [(DELETED, 1)])
+        self.assertEqual(self.watcher.store.asset_ids(), set([2, 3]))
+
+    def test_failed_poll(self):
+        self.watcher.poll()
+        self.api.put(1, 2000)
+        self.api.failing_page = 2
+        with self.assertRaises(IOError):
+            self.watcher.poll()
+        self.assertEqual(self.events, [])
+
+        # The change is found again once listing succeeds.
+        self.api.failing_page = None
+        self.watcher.poll()
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events], [(CHANGED, 1)])
+
+    def test_persistent_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'fingerprints.db')
+        AssetWatcher(self.api, store=FingerprintStore(path)).poll()
+        self.api.put(1, 2000)
+        watcher = AssetWatcher(self.api, store=FingerprintStore(path))
+        watcher.subscribe(self.events.append)
+        watcher.poll()
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events], [(CHANGED, 1)])
+
+    def test_queue(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        queue = self.watcher.queue(loop)
+        self.watcher.poll()
+        self.api.put(4, 2000)
+        self.watcher.poll()
+        event = loop.run_until_complete(
+            asyncio.wait_for(queue.get(), timeout=1))
+        self.assertEqual((event.type, event.asset_id), (ADDED, 4))
+
+    def test_closed_queue(self):
+        loop = asyncio.new_event_loop()
+        self.watcher.queue(loop)
+        loop.close()
+        self.watcher.poll()
+        for filesize in (200, 300):
+            self.api.put(1, 1000, filesize=filesize)
+            self.watcher.poll()
+        self.assertEqual(
+            [(e.type, e.asset_id) for e in self.events],
+            [(CHANGED, 1), (CHANGED, 1)])
+        self.assertEqual(self.watcher.queues, [])
+
+    def test_socket(self):
+        self.watcher.serve(('127.0.0.1', 0))
+        self.addCleanup(self.watcher.stop)
+        client = socket.create_connection(
+            self.watcher.server.getsockname(), timeout=1)
+        self.addCleanup(client.close)
+        self.watcher.poll()
+        deadline = time.time() + 1
+        while not self.watcher.clients and time.time() < deadline:
+            time.sleep(0.01)  # Wait for the connection to be accepted
+        self.api.put(1, 2000)
+        self.watcher.poll()
+        line = client.makefile('r').readline()
+        self.assertEqual(json.loads(line)['type'], CHANGED)
+        self.assertEqual(json.loads(line)['assetId'], 1)
+
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'events.sock')
+        self.watcher.serve(path)
+        self.watcher.stop()
+        self.assertFalse(os.path.exists(path))
+
+        # A socket left behind by a process which did not stop is replaced.
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        self.watcher.serve(path)
+        self.addCleanup(self.watcher.stop)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(client.close)
+        client.connect(path)
+
+
+if __name__ == '__main__':
+    unittest.main()